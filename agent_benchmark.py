@@ -0,0 +1,85 @@
+#!/usr/bin/env python3.11
+"""
+Project Alfred - Agent Latency Benchmark
+Compares two-call (analyze, then plan), speculative and fused analyze+plan modes using a stubbed LLM
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+from app.core import agent as agent_module
+from app.core.agent import CoreAgent
+from app.services.llm import LLMService
+from app.services.llm_stub import FixedLatency, StubLLMBackend
+
+LLM_DELAY = 0.3  # Simulated upstream latency per completion
+NUM_TASKS = 10
+
+async def run_mode(name: str, fused: bool = False, speculative: bool = False) -> dict:
+    """Run NUM_TASKS tasks sequentially and collect latencies"""
+    stub = StubLLMBackend(latency=FixedLatency(LLM_DELAY))
+    agent_module.llm_service = LLMService(transport=stub.transport())
+    agent = CoreAgent(user_id=f"bench-{name}", fused_planning=fused, speculative=speculative)
+    
+    latencies = []
+    phases = {}
+    for i in range(NUM_TASKS):
+        start = time.perf_counter()
+        result = await agent.process_task(f"Hello Alfred! #{i}", use_cache=False)
+        latencies.append(time.perf_counter() - start)
+        assert result["status"] == "success"
+        assert {"analysis", "plan", "execution", "llm"} <= set(result["metadata"])
+        for method, summary in result["metadata"]["llm"]["by_method"].items():
+            phases.setdefault(method, []).append(summary["latency"])
+    
+    await agent_module.llm_service.aclose()
+    return {
+        "latencies": latencies,
+        "phases": phases,
+        "llm_calls": stub.stats["requests"]
+    }
+
+
+def print_mode(name: str, result: dict):
+    latencies = result["latencies"]
+    print(f"\n📈 {name}:")
+    print(f"  LLM Calls: {result['llm_calls']} ({result['llm_calls'] / NUM_TASKS:.1f} per task)")
+    print(f"  Mean: {statistics.mean(latencies):.3f}s")
+    print(f"  Median: {statistics.median(latencies):.3f}s")
+    print(f"  Max: {max(latencies):.3f}s")
+    for method, phase_latencies in sorted(result["phases"].items()):
+        print(f"    {method}: {statistics.mean(phase_latencies) * 1000:.0f}ms mean")
+
+
+async def main():
+    print("=" * 60)
+    print("PROJECT ALFRED - AGENT LATENCY BENCHMARK")
+    print(f"  {NUM_TASKS} tasks per mode, {LLM_DELAY * 1000:.0f}ms per LLM call")
+    print("=" * 60)
+    
+    two_call = await run_mode("two-call")
+    speculative = await run_mode("speculative", speculative=True)
+    fused = await run_mode("fused", fused=True)
+    
+    print_mode("Two-call mode (analyze, then plan)", two_call)
+    print_mode("Speculative mode (plan and respond in parallel)", speculative)
+    print_mode("Fused mode (analyze+plan)", fused)
+    
+    baseline = statistics.mean(two_call["latencies"])
+    print()
+    for name, result in (("Speculative", speculative), ("Fused", fused)):
+        saved = baseline - statistics.mean(result["latencies"])
+        print(f"⏱️  {name} mode saves {saved * 1000:.0f}ms per task on average")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,13 +4,23 @@ State machine and lifecycle management for the cognitive loop
 """
 
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
+import os
 import uuid
+import asyncio
 from app.services.llm import llm_service
+from app.services.tracing import tracer
+from app.services.deadline import Deadline, DeadlineExceededError, bounded, current_deadline, deadline_scope, has_time_for
 from app.core.tools import tool_registry
-from app.core.digital_twin import digital_twin
+from app.core.fast_path import fast_path_router, render_template
+from app.core.speculation import Speculation, response_speculator
+from app.core.response_composer import response_composer
+from app.core.plan_graph import build_dependencies, resolve_references, step_number
+from app.core.task_queue import TaskQueue, TaskTicket
+from app.core.conversation_memory import ConversationHistory
+from app.core.event_bus import event_bus
 from app.core.proactive_engine import proactive_engine
 
 
@@ -23,6 +33,7 @@ class AgentState(Enum):
     OBSERVING = "observing"
     ERROR = "error"
     COMPLETE = "complete"
+    CANCELLED = "cancelled"
 
 
 @dataclass
@@ -35,29 +46,51 @@ class Task:
     status: str = "pending"
     result: Optional[Any] = None
     error: Optional[str] = None
+    use_cache: bool = True
+    complexity: Optional[str] = None
+    deadline: Optional[Deadline] = None
 
 
 @dataclass
 class WorldModel:
     """Stateful context and knowledge about the user and environment"""
     user_id: str
-    conversation_history: List[Dict[str, Any]] = field(default_factory=list)
+    conversation_history: ConversationHistory = field(default_factory=ConversationHistory)
     user_preferences: Dict[str, Any] = field(default_factory=dict)
     context: Dict[str, Any] = field(default_factory=dict)
     tools_available: List[str] = field(default_factory=list)
+    context_messages: int = field(default_factory=lambda: int(os.getenv("AGENT_CONTEXT_MESSAGES", "6")))
     
-    def add_message(self, role: str, content: str):
-        """Add a message to conversation history"""
+    def add_message(self, role: str, content: str, timestamp: Optional[str] = None):
+        """Add a message to conversation history (the oldest is folded into the summary once full)"""
         self.conversation_history.append({
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp or datetime.now().isoformat()
         })
     
     def get_context_summary(self) -> str:
-        """Generate a summary of current context"""
-        recent_messages = self.conversation_history[-5:] if len(self.conversation_history) > 5 else self.conversation_history
-        return f"Recent conversation: {len(recent_messages)} messages. Available tools: {', '.join(self.tools_available)}"
+        """Generate the conversational context for prompts: rolling summary plus the latest turns"""
+        parts = []
+        summary = self.conversation_history.summary.render()
+        if summary:
+            parts.append(summary)
+        
+        # The newest message is the request itself, which prompts carry separately
+        recent_messages = self.conversation_history.recent(self.context_messages + 1)[:-1]
+        if recent_messages:
+            parts.append("Recent conversation:\n" + "\n".join(
+                f"{m['role']}: {self._clip(m['content'])}" for m in recent_messages
+            ))
+        
+        if self.tools_available:
+            parts.append(f"Available tools: {', '.join(self.tools_available)}")
+        return "\n\n".join(parts) if parts else "No previous conversation."
+    
+    @staticmethod
+    def _clip(text: str, limit: int = 400) -> str:
+        text = " ".join(str(text).split())
+        return text if len(text) <= limit else text[:limit - 1] + "…"
 
 
 class CoreAgent:
@@ -65,171 +98,608 @@ class CoreAgent:
     The core cognitive agent implementing the Analyze -> Plan -> Execute -> Observe loop
     """
     
-    def __init__(self, user_id: str):
+    def __init__(
+        self,
+        user_id: str,
+        fused_planning: Optional[bool] = None,
+        fast_path: Optional[bool] = None,
+        speculative: Optional[bool] = None,
+        tool_calling: Optional[bool] = None
+    ):
         self.user_id = user_id
         self.state = AgentState.IDLE
         self.world_model = WorldModel(user_id=user_id)
         self.current_task: Optional[Task] = None
         self.plan: Optional[List[Dict[str, Any]]] = None
         
-    async def process_task(self, user_input: str) -> Dict[str, Any]:
+        # current_task/plan/state belong to one task at a time: this user's tasks run in order
+        self.queue = TaskQueue(user_id)
+        
+        # Fused mode analyzes and plans in one LLM round trip
+        if fused_planning is None:
+            fused_planning = os.getenv("AGENT_FUSED_PLANNING", "false").lower() == "true"
+        self.fused_planning = fused_planning
+        
+        # Fast path answers trivially routable requests without the LLM
+        if fast_path is None:
+            fast_path = os.getenv("AGENT_FAST_PATH", "true").lower() == "true"
+        self.fast_path = fast_path
+        
+        # Speculative mode drafts the answer to simple requests while planning
+        if speculative is None:
+            speculative = response_speculator.enabled
+        self.speculative = speculative
+        self._speculation: Optional[Speculation] = None
+        
+        # Tool-calling mode plans with native function calls carrying typed arguments
+        if tool_calling is None:
+            tool_calling = os.getenv("AGENT_TOOL_CALLING", "false").lower() == "true"
+        self.tool_calling = tool_calling
+        
+        # Independent plan steps run concurrently, up to this many at once
+        self.max_parallel_steps = max(int(os.getenv("AGENT_MAX_PARALLEL_STEPS", "4")), 1)
+        
+        # Receives phase, plan and step events for the running task, if its caller asked
+        self._on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    
+    async def process_task(
+        self,
+        user_input: str,
+        use_cache: bool = True,
+        ticket: Optional[TaskTicket] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """
-        Main entry point: Process a user task through the cognitive loop
+        Main entry point: Process a user task through the cognitive loop.
+        Tasks for this user run one at a time in arrival order; raises
+        AgentBusyError if the queue is full (reserve a ticket up front with
+        self.queue.reserve() to find out before doing other work).
+        on_event, if given, is called with every state transition ("phase"),
+        the plan and each step result as soon as they happen.
+        deadline (by default the caller's current one) bounds every LLM, tool
+        and database hop of the task; optional work is skipped when it is near.
         """
-        # Create new task
-        self.current_task = Task(user_input=user_input)
-        self.world_model.add_message("user", user_input)
+        deadline = deadline or current_deadline()
+        async with ticket or self.queue.reserve():
+            self._on_event = on_event
+            try:
+                return await self._run_task(user_input, use_cache, deadline)
+            finally:
+                self._on_event = None
+    
+    async def process_task_stream(
+        self,
+        user_input: str,
+        use_cache: bool = True,
+        ticket: Optional[TaskTicket] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming entry point: yields phase, step and token events while the
+        cognitive loop runs, finishing with a "done" event carrying the same
+        payload process_task returns. Queued and bounded like process_task.
+        """
+        deadline = deadline or current_deadline()
+        async with ticket or self.queue.reserve():
+            events = self._run_task_stream(user_input, use_cache, deadline)
+            try:
+                async for event in events:
+                    yield event
+            finally:
+                await events.aclose()
+    
+    async def _run_task(self, user_input: str, use_cache: bool, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Run the cognitive loop for one task (the caller holds the queue turn)"""
+        self._start_task(user_input, use_cache, deadline)
         
-        try:
-            # ANALYZE: Understand the task
-            self._transition_to(AgentState.ANALYZING)
-            analysis = await self._analyze()
-            
-            # PLAN: Create execution plan
-            self._transition_to(AgentState.PLANNING)
-            self.plan = await self._plan(analysis)
-            
-            # EXECUTE: Carry out the plan
-            self._transition_to(AgentState.EXECUTING)
-            execution_result = await self._execute(self.plan)
-            
-            # OBSERVE: Evaluate the result
-            self._transition_to(AgentState.OBSERVING)
+        with deadline_scope(deadline), tracer.span("agent.task", user_id=self.user_id, task_id=self.current_task.id) as span:
+            try:
+                # ANALYZE: Understand the task (fast path / fused mode plan it too)
+                self._transition_to(AgentState.ANALYZING)
+                with tracer.span("agent.analyze"):
+                    preplanned = await self._preplan()
+                    analysis = preplanned["analysis"] if preplanned else await self._analyze()
+                self.current_task.complexity = analysis.get("complexity")
+                
+                # PLAN: Create execution plan (simple answers are drafted meanwhile)
+                self._transition_to(AgentState.PLANNING)
+                with tracer.span("agent.plan", preplanned=preplanned is not None) as plan_span:
+                    self.plan = preplanned["plan"] if preplanned else await self._plan_speculatively(analysis)
+                    plan_span.set(steps=len(self.plan))
+                self._emit({"event": "plan", "plan": self.plan})
+                
+                # EXECUTE: Carry out the plan
+                self._transition_to(AgentState.EXECUTING)
+                with tracer.span("agent.execute"):
+                    execution_result = await self._execute(self.plan)
+                
+                return self._complete_task(analysis, execution_result)
+                
+            except asyncio.CancelledError:
+                self._cancel_task()
+                raise
+            except Exception as e:
+                span.fail(e)
+                return self._fail_task(e)
+    
+    async def _run_task_stream(self, user_input: str, use_cache: bool, deadline: Optional[Deadline] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of _run_task"""
+        self._start_task(user_input, use_cache, deadline)
+        
+        with deadline_scope(deadline), tracer.span("agent.task", user_id=self.user_id, task_id=self.current_task.id, stream=True) as span:
+            try:
+                self._transition_to(AgentState.ANALYZING)
+                yield {"event": "phase", "phase": self.state.value}
+                with tracer.span("agent.analyze"):
+                    preplanned = await self._preplan()
+                    analysis = preplanned["analysis"] if preplanned else await self._analyze()
+                self.current_task.complexity = analysis.get("complexity")
+                
+                self._transition_to(AgentState.PLANNING)
+                yield {"event": "phase", "phase": self.state.value}
+                with tracer.span("agent.plan", preplanned=preplanned is not None) as plan_span:
+                    self.plan = preplanned["plan"] if preplanned else await self._plan_speculatively(analysis)
+                    plan_span.set(steps=len(self.plan))
+                yield {"event": "plan", "plan": self.plan}
+                
+                self._transition_to(AgentState.EXECUTING)
+                yield {"event": "phase", "phase": self.state.value}
+                results = []
+                await self._extract_parameters(self.plan)
+                for step in self.plan:
+                    if step.get("action") == "generate_response" and self._speculation and not results:
+                        # The drafted answer is already (being) generated: send it whole
+                        output = await response_speculator.commit(self._take_speculation())
+                        yield {"event": "token", "content": output}
+                        result = {
+                            "step": step["step"],
+                            "success": True,
+                            "output": output,
+                            "final": True
+                        }
+                    elif step.get("action") == "generate_response":
+                        composed = response_composer.compose_step(
+                            user_input,
+                            self.current_task.complexity,
+                            results,
+                            prefer_local=not has_time_for()
+                        )
+                        if composed is not None:
+                            # Rendered locally from the tool results: send it whole
+                            yield {"event": "token", "content": composed}
+                            result = {
+                                "step": step["step"],
+                                "success": True,
+                                "output": composed,
+                                "final": True,
+                                "composed": True
+                            }
+                        else:
+                            # Forward tokens as the model produces them
+                            chunks = []
+                            async for token in llm_service.stream_response(
+                                self.current_task.user_input,
+                                self.world_model.get_context_summary(),
+                                {"previous_results": results},
+                                complexity=self.current_task.complexity
+                            ):
+                                chunks.append(token)
+                                yield {"event": "token", "content": token}
+                            result = {
+                                "step": step["step"],
+                                "success": True,
+                                "output": "".join(chunks),
+                                "final": True
+                            }
+                    else:
+                        result = await self._execute_step(step, results)
+                    yield {"event": "step", "result": result}
+                    results.append(result)
+                
+                execution_result = self._summarize_execution(results)
+                yield {"event": "done", **self._complete_task(analysis, execution_result)}
+                
+            except (asyncio.CancelledError, GeneratorExit):
+                self._cancel_task()
+                raise
+            except Exception as e:
+                span.fail(e)
+                yield {"event": "error", **self._fail_task(e)}
+    
+    def _start_task(self, user_input: str, use_cache: bool = True, deadline: Optional[Deadline] = None):
+        """Create a new task and record the user message"""
+        self._discard_speculation()
+        self.current_task = Task(user_input=user_input, use_cache=use_cache, deadline=deadline)
+        self.world_model.add_message("user", user_input)
+        llm_service.metrics.begin_request()
+    
+    def _complete_task(self, analysis: Dict[str, Any], execution_result: Dict[str, Any]) -> Dict[str, Any]:
+        """OBSERVE the execution result, close out the task and build the response payload"""
+        self._transition_to(AgentState.OBSERVING)
+        with tracer.span("agent.observe"):
             observation = self._observe(execution_result)
-            
-            # Mark as complete
-            self._transition_to(AgentState.COMPLETE)
-            self.current_task.status = "complete"
-            self.current_task.completed_at = datetime.now()
-            self.current_task.result = observation
-            
-            # Add assistant response to world model
-            self.world_model.add_message("assistant", observation.get("response", ""))
-            
-            return {
-                "status": "success",
-                "task_id": self.current_task.id,
-                "response": observation.get("response"),
-                "metadata": {
-                    "analysis": analysis,
-                    "plan": self.plan,
-                    "execution": execution_result
-                }
-            }
-            
-        except Exception as e:
-            self._transition_to(AgentState.ERROR)
-            self.current_task.status = "error"
-            self.current_task.error = str(e)
-            
-            return {
-                "status": "error",
-                "task_id": self.current_task.id,
-                "error": str(e)
+        
+        # Mark as complete
+        self._transition_to(AgentState.COMPLETE)
+        self.current_task.status = "complete"
+        self.current_task.completed_at = datetime.now()
+        self.current_task.result = observation
+        
+        # Add assistant response to world model
+        self.world_model.add_message("assistant", observation.get("response", ""))
+        
+        return {
+            "status": "success",
+            "task_id": self.current_task.id,
+            "response": observation.get("response"),
+            "metadata": {
+                "analysis": analysis,
+                "plan": self.plan,
+                "execution": execution_result,
+                "llm": llm_service.metrics.request_summary(),
+                "trace_id": tracer.current_trace_id()
             }
+        }
+    
+    def _fail_task(self, error: Exception) -> Dict[str, Any]:
+        """Move the current task into the error state"""
+        self._discard_speculation()
+        self._transition_to(AgentState.ERROR)
+        self.current_task.status = "error"
+        self.current_task.error = str(error)
+        
+        # A hop that gave up on its trimmed timeout fails for the same reason
+        deadline = self.current_task.deadline
+        return {
+            "status": "error",
+            "task_id": self.current_task.id,
+            "error": str(error),
+            "deadline_exceeded": isinstance(error, DeadlineExceededError) or (deadline is not None and deadline.expired)
+        }
+    
+    def _cancel_task(self):
+        """Record that the current task was cancelled mid-flight (the caller re-raises)"""
+        if self.current_task.status == "complete":
+            # A stream closed after its done event
+            return
+        self._discard_speculation()
+        self._transition_to(AgentState.CANCELLED)
+        self.current_task.status = "cancelled"
+        self.current_task.completed_at = datetime.now()
     
     def _transition_to(self, new_state: AgentState):
         """Transition to a new state"""
-        print(f"[Agent] {self.state.value} -> {new_state.value}")
+        tracer.event("agent.state", from_state=self.state.value, to_state=new_state.value)
         self.state = new_state
+        self._emit({"event": "phase", "phase": new_state.value})
+    
+    def _emit(self, event: Dict[str, Any]):
+        """Hand an event to the current task's listener (process_task's on_event)"""
+        if self._on_event:
+            self._on_event(event)
     
     async def _analyze(self) -> Dict[str, Any]:
         """
         ANALYZE phase: Understand the user's intent and context using LLM
         """
         user_input = self.current_task.user_input
-        context = self.world_model.get_context_summary()
-        
-        # Get personalized context from Digital Twin
-        personalization = proactive_engine.get_contextual_prompt_enhancement(self.user_id, user_input)
-        enhanced_context = f"{context}\n\n{personalization}" if personalization else context
         
         # Use LLM to analyze intent
-        analysis = await llm_service.analyze_intent(user_input, enhanced_context)
+        analysis = await llm_service.analyze_intent(
+            user_input,
+            self._build_context(),
+            use_cache=self.current_task.use_cache
+        )
         
         return analysis
     
+    async def _preplan(self) -> Optional[Dict[str, Any]]:
+        """
+        Produce the analysis and plan together when possible: first the local
+        fast path, then the fused LLM call. Returns None when the regular
+        two-call flow should run.
+        """
+        if self.fast_path:
+            routed = fast_path_router.route(self.current_task.user_input)
+            if routed:
+                return routed
+        
+        if self.fused_planning:
+            return await self._analyze_and_plan()
+        
+        return None
+    
+    async def _analyze_and_plan(self) -> Optional[Dict[str, Any]]:
+        """
+        Fused ANALYZE + PLAN: one structured LLM call returning both the
+        analysis and the step list. Returns None if the fused call failed,
+        in which case the caller falls back to _analyze and _plan.
+        """
+        available_tools = [t.name for t in tool_registry.list_tools()]
+        
+        return await llm_service.analyze_and_plan(
+            self.current_task.user_input,
+            self._build_context(),
+            available_tools,
+            use_cache=self.current_task.use_cache
+        )
+    
+    def _build_context(self) -> str:
+        """Combine the world model summary with Digital Twin personalization"""
+        context = self.world_model.get_context_summary()
+        
+        # Get personalized context from Digital Twin (optional: skipped when the deadline is near)
+        if not has_time_for():
+            return context
+        personalization = proactive_engine.get_contextual_prompt_enhancement(self.user_id, self.current_task.user_input)
+        return f"{context}\n\n{personalization}" if personalization else context
+    
     async def _plan(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         PLAN phase: Create a step-by-step execution plan using LLM
         """
         user_input = self.current_task.user_input
         
+        if self.tool_calling:
+            plan = await llm_service.plan_with_tools(
+                user_input,
+                analysis,
+                tool_registry.get_function_schemas(),
+                use_cache=self.current_task.use_cache
+            )
+            if plan is not None:
+                return plan
+        
         # Get available tools
         tools = tool_registry.list_tools()
         available_tools = [t.name for t in tools]
         
         # Use LLM to create plan
-        plan = await llm_service.create_plan(user_input, analysis, available_tools)
+        plan = await llm_service.create_plan(
+            user_input,
+            analysis,
+            available_tools,
+            use_cache=self.current_task.use_cache
+        )
+        
+        return plan
+    
+    async def _plan_speculatively(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        PLAN phase with speculation: for simple, tool-free requests start
+        generate_response alongside _plan. The draft is kept for the first
+        step if the plan confirms no tools are needed, and cancelled otherwise.
+        """
+        if not (self.speculative and response_speculator.should_speculate(analysis)):
+            return await self._plan(analysis)
+        
+        # Exactly the inputs _execute_step would use for a leading generate_response step
+        user_input = self.current_task.user_input
+        context = self.world_model.get_context_summary()
+        complexity = self.current_task.complexity
+        speculation = response_speculator.start(
+            lambda: llm_service.generate_response(user_input, context, {"previous_results": []}, complexity=complexity),
+            llm_service.metrics
+        )
+        
+        try:
+            plan = await self._plan(analysis)
+        except BaseException:
+            response_speculator.discard(speculation)
+            raise
         
+        if response_speculator.matches(plan):
+            self._speculation = speculation
+        else:
+            response_speculator.discard(speculation)
         return plan
     
+    def _take_speculation(self) -> Speculation:
+        speculation, self._speculation = self._speculation, None
+        return speculation
+    
+    def _discard_speculation(self):
+        """Cancel a confirmed draft that never got used (e.g. the task failed)"""
+        if self._speculation:
+            response_speculator.discard(self._take_speculation())
+    
     async def _execute(self, plan: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        EXECUTE phase: Carry out the plan step by step
+        EXECUTE phase: Carry out the plan, running steps that do not depend
+        on each other concurrently. Results keep the plan's order.
+        """
+        await self._extract_parameters(plan)
+        
+        dependencies = build_dependencies(plan)
+        semaphore = asyncio.Semaphore(self.max_parallel_steps)
+        tasks: List[asyncio.Task] = []
+        
+        async def run(index: int) -> Dict[str, Any]:
+            deps = dependencies[index]
+            if deps:
+                await asyncio.gather(*(tasks[d] for d in deps))
+            async with semaphore:
+                # Dependency results are passed in plan order, whatever order they finished in
+                result = await self._execute_step(plan[index], [tasks[d].result() for d in deps])
+            self._emit({"event": "step", "result": result})
+            return result
+        
+        for index in range(len(plan)):
+            tasks.append(asyncio.create_task(run(index)))
+        try:
+            results = list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        return self._summarize_execution(results)
+    
+    async def _extract_parameters(self, plan: List[Dict[str, Any]]):
+        """
+        Fill in parameters for every tool step that lacks them with a single
+        batched LLM call keyed by step number. Steps the batch does not
+        answer keep empty parameters and are extracted one at a time by
+        _execute_step.
         """
-        results = []
+        pending = {}
+        for step in plan:
+            if step.get("action") != "use_tool" or step.get("parameters"):
+                continue
+            tool = tool_registry.get_tool(step.get("tool"))
+            number = step_number(step.get("step"))
+            if tool and number is not None:
+                pending[number] = {
+                    "tool": step["tool"],
+                    "description": step.get("description", ""),
+                    "parameters": self._tool_parameter_specs(tool)
+                }
         
+        # A single step gains nothing from batching
+        if len(pending) < 2:
+            return
+        
+        extracted = await llm_service.extract_batch_parameters(
+            self.current_task.user_input,
+            pending,
+            use_cache=self.current_task.use_cache,
+            complexity=self.current_task.complexity
+        )
         for step in plan:
-            action = step.get("action")
-            
-            if action == "generate_response":
+            number = step_number(step.get("step"))
+            if number in extracted and not step.get("parameters"):
+                step["parameters"] = extracted[number]
+    
+    def _tool_parameter_specs(self, tool) -> List[Dict[str, Any]]:
+        """Describe a tool's parameters for the extraction prompts"""
+        return [{
+            "name": p.name,
+            "type": p.type,
+            "description": p.description
+        } for p in tool.get_metadata().parameters]
+    
+    async def _execute_step(self, step: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Execute a single plan step given the results of the steps before it
+        """
+        action = step.get("action")
+        with tracer.span("agent.step", step=step.get("step"), action=action, tool=step.get("tool")) as span:
+            result = await self._dispatch_step(step, results)
+            span.set(success=result.get("success", False), composed=result.get("composed", False))
+            if not result.get("success", False):
+                span.fail(result.get("error") or "Step failed")
+        return result
+    
+    async def _dispatch_step(self, step: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Carry out one step by its action"""
+        action = step.get("action")
+        
+        if action == "generate_response":
+            if self._speculation and not results:
+                # Drafted during planning from exactly these inputs
+                response_text = await response_speculator.commit(self._take_speculation())
+            else:
+                composed = response_composer.compose_step(
+                    self.current_task.user_input,
+                    self.current_task.complexity,
+                    results,
+                    prefer_local=not has_time_for()
+                )
+                if composed is not None:
+                    # The tool results speak for themselves
+                    return {
+                        "step": step["step"],
+                        "success": True,
+                        "output": composed,
+                        "final": True,
+                        "composed": True
+                    }
+                
                 # Generate response using LLM
                 context = self.world_model.get_context_summary()
                 response_text = await llm_service.generate_response(
                     self.current_task.user_input,
                     context,
-                    {"previous_results": results}
+                    {"previous_results": results},
+                    complexity=self.current_task.complexity
                 )
-                result = {
+            return {
+                "step": step["step"],
+                "success": True,
+                "output": response_text,
+                "final": True
+            }
+        elif action == "format_response":
+            # Render previous step outputs into the final response locally
+            try:
+                return {
                     "step": step["step"],
                     "success": True,
-                    "output": response_text
+                    "output": render_template(step["template"], results),
+                    "final": True
                 }
-            elif action == "use_tool":
-                # Execute a tool
-                tool_name = step.get("tool")
-                tool = tool_registry.get_tool(tool_name)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                return {
+                    "step": step["step"],
+                    "success": False,
+                    "error": f"Could not format response: {e}"
+                }
+        elif action == "use_tool":
+            # Execute a tool
+            tool_name = step.get("tool")
+            tool = tool_registry.get_tool(tool_name)
+            
+            if tool:
+                # Extract parameters
+                params = step.get("parameters", {})
+                if not params:
+                    # Try to extract from user input
+                    params = await llm_service.extract_tool_parameters(
+                        self.current_task.user_input,
+                        tool_name,
+                        self._tool_parameter_specs(tool),
+                        use_cache=self.current_task.use_cache,
+                        complexity=self.current_task.complexity
+                    )
                 
-                if tool:
-                    # Extract parameters
-                    params = step.get("parameters", {})
-                    if not params:
-                        # Try to extract from user input
-                        tool_metadata = tool.get_metadata()
-                        params = await llm_service.extract_tool_parameters(
-                            self.current_task.user_input,
-                            tool_name,
-                            [{
-                                "name": p.name,
-                                "type": p.type,
-                                "description": p.description
-                            } for p in tool_metadata.parameters]
-                        )
-                    
-                    # Execute tool
-                    tool_result = await tool.execute(**params)
-                    result = {
-                        "step": step["step"],
-                        "success": tool_result.get("success", False),
-                        "output": tool_result.get("output"),
-                        "tool": tool_name
-                    }
-                else:
-                    result = {
+                # Substitute referenced step outputs, then validate locally before dispatch
+                params = resolve_references(params, results)
+                params, errors = tool_registry.validate_arguments(tool_name, params)
+                if errors:
+                    return {
                         "step": step["step"],
                         "success": False,
-                        "error": f"Tool not found: {tool_name}"
+                        "error": f"Invalid arguments for {tool_name}: {'; '.join(errors)}",
+                        "tool": tool_name
                     }
+                
+                # Execute tool
+                with tracer.span(f"tool.{tool_name}") as span:
+                    tool_result = await bounded(tool.execute(**params), operation=f"tool {tool_name}")
+                    span.set(success=tool_result.get("success", False))
+                return {
+                    "step": step["step"],
+                    "success": tool_result.get("success", False),
+                    "output": tool_result.get("output"),
+                    "tool": tool_name,
+                    "parameters": params
+                }
             else:
-                result = {
+                return {
                     "step": step["step"],
                     "success": False,
-                    "error": f"Unknown action: {action}"
+                    "error": f"Tool not found: {tool_name}"
                 }
-            
-            results.append(result)
-        
+        else:
+            return {
+                "step": step["step"],
+                "success": False,
+                "error": f"Unknown action: {action}"
+            }
+    
+    def _summarize_execution(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregate step results into the execution metadata"""
         return {
             "steps_completed": len(results),
             "results": results,
@@ -240,7 +710,7 @@ class CoreAgent:
         """
         OBSERVE phase: Evaluate the execution and determine if task is complete
         """
-        # Update Digital Twin with interaction data
+        # Digital Twin learning and suggestion generation happen off the critical path
         tools_used = [r.get("tool") for r in execution_result.get("results", []) if r.get("tool")]
         interaction_data = {
             "task_type": "general",
@@ -248,14 +718,17 @@ class CoreAgent:
             "topics": [],
             "intent": "task_completion"
         }
-        digital_twin.update_profile(self.user_id, interaction_data)
+        event_bus.publish_nowait("interaction_completed", {
+            "user_id": self.user_id,
+            "user_input": self.current_task.user_input,
+            "interaction": interaction_data
+        })
         
-        # Generate proactive suggestions
-        suggestions = proactive_engine.generate_suggestions(self.user_id, {"current_task": self.current_task.user_input})
+        # Suggestions generated after this user's previous interaction (optional, like personalization)
+        suggestions = proactive_engine.latest_suggestions.get(self.user_id, []) if has_time_for() else []
         
         if execution_result.get("overall_success"):
-            # Extract the response from execution results
-            response = execution_result["results"][0].get("output", "Task completed successfully.")
+            response = response_composer.final_response(execution_result["results"])
             
             return {
                 "task_complete": True,
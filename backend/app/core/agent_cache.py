@@ -0,0 +1,137 @@
+"""
+Project Alfred - Agent Cache
+Bounded LRU/idle-TTL cache of CoreAgents, rehydrated from storage on demand
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+from app.core.agent import CoreAgent
+from app.db.supabase_client import db_client
+
+
+class AgentCache:
+    """
+    Keeps at most max_agents CoreAgents, dropping the least recently used
+    and any idle longer than idle_ttl. Agents with queued or running tasks
+    are never evicted, so a user never has two live agents. A user whose
+    agent was evicted gets a fresh one whose world model is reloaded from
+    their latest conversation.
+    """
+    
+    def __init__(
+        self,
+        max_agents: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        rehydrate_messages: Optional[int] = None
+    ):
+        self.max_agents = max_agents or int(os.getenv("AGENT_CACHE_SIZE", "1000"))
+        self.idle_ttl = idle_ttl if idle_ttl is not None else float(os.getenv("AGENT_CACHE_TTL", "1800"))
+        self.rehydrate_messages = rehydrate_messages if rehydrate_messages is not None else int(os.getenv("AGENT_REHYDRATE_MESSAGES", "20"))
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "rehydrated": 0,
+            "rehydrated_messages": 0
+        }
+    
+    async def get(self, user_id: str, create: bool = True) -> Optional[CoreAgent]:
+        """
+        Return the user's agent, loading it from storage if it was evicted.
+        With create=False, unknown users (nothing in the cache or the
+        database) give None instead of a new agent.
+        """
+        self._expire()
+        
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            self.stats["hits"] += 1
+            entry["last_used"] = time.monotonic()
+            self.entries.move_to_end(user_id)
+            return entry["agent"]
+        
+        if not create and not await db_client.get_user(user_id):
+            return None
+        
+        # Concurrent misses for one user share a single load
+        loading = self._loading.get(user_id)
+        if loading is None:
+            self.stats["misses"] += 1
+            loading = asyncio.ensure_future(self._load(user_id))
+            self._loading[user_id] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return await asyncio.shield(loading)
+    
+    def values(self) -> Iterator[CoreAgent]:
+        return (entry["agent"] for entry in list(self.entries.values()))
+    
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.entries
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and the current size"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "max_agents": self.max_agents,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+    
+    async def _load(self, user_id: str) -> CoreAgent:
+        agent = CoreAgent(user_id=user_id)
+        await self._rehydrate(agent)
+        self.entries[user_id] = {"agent": agent, "last_used": time.monotonic()}
+        self._evict()
+        return agent
+    
+    async def _rehydrate(self, agent: CoreAgent):
+        """Reload the tail of the user's latest conversation into the world model"""
+        if self.rehydrate_messages <= 0:
+            return
+        conversations = await db_client.get_conversations(agent.user_id, limit=1)
+        if not conversations:
+            return
+        messages = await db_client.get_messages(conversations[0]["id"], limit=self.rehydrate_messages, recent=True)
+        for message in messages:
+            agent.world_model.add_message(message["role"], message["content"], message.get("created_at"))
+        if messages:
+            self.stats["rehydrated"] += 1
+            self.stats["rehydrated_messages"] += len(messages)
+    
+    def _evict(self):
+        """Drop least recently used idle agents until the cache fits"""
+        for user_id in list(self.entries):
+            if len(self.entries) <= self.max_agents:
+                break
+            if not self._busy(user_id):
+                del self.entries[user_id]
+                self.stats["evictions"] += 1
+    
+    def _expire(self):
+        """Drop agents idle for longer than idle_ttl (oldest first)"""
+        if self.idle_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        for user_id, entry in list(self.entries.items()):
+            if entry["last_used"] > cutoff:
+                break
+            if not self._busy(user_id):
+                del self.entries[user_id]
+                self.stats["expirations"] += 1
+    
+    def _busy(self, user_id: str) -> bool:
+        return self.entries[user_id]["agent"].queue.depth > 0
+
+
+# Global agent cache instance
+agent_cache = AgentCache()
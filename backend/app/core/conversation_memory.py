@@ -0,0 +1,149 @@
+"""
+Project Alfred - Conversation Memory
+Fixed-size message history with a rolling extractive summary of evicted turns
+"""
+
+import os
+import re
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD = re.compile(r"[A-Za-z][A-Za-z'-]+|\d+(?:\.\d+)?")
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "then", "so", "of", "to", "in", "on", "at", "by",
+    "for", "with", "from", "about", "as", "is", "are", "was", "were", "be", "been", "being", "it",
+    "its", "this", "that", "these", "those", "i", "you", "he", "she", "we", "they", "me", "my",
+    "your", "our", "their", "them", "us", "do", "does", "did", "have", "has", "had", "can", "could",
+    "would", "should", "will", "shall", "may", "might", "must", "not", "no", "yes", "what", "which",
+    "who", "how", "when", "where", "why", "there", "here", "just", "also", "very", "some", "any",
+    "all", "more", "most", "other", "into", "than", "too", "please", "thanks", "thank", "hi",
+    "hello", "let", "like", "get", "got", "know", "want", "need", "sure", "okay", "ok", "i'm",
+    "it's", "i'll", "you're", "that's", "here's"
+}
+
+
+class RollingSummary:
+    """
+    Incremental extractive summary of messages that have left the history.
+    Each folded message contributes its most informative sentence; only the
+    best max_sentences are kept (older ones lose weight as turns pass), plus
+    a bounded term count for the conversation's topics. Nothing here grows
+    with the length of the conversation.
+    """
+    
+    def __init__(
+        self,
+        max_sentences: Optional[int] = None,
+        max_topics: int = 8,
+        max_sentence_chars: int = 240,
+        decay: float = 0.15
+    ):
+        self.max_sentences = max_sentences if max_sentences is not None else int(os.getenv("AGENT_SUMMARY_SENTENCES", "6"))
+        self.max_topics = max_topics
+        self.max_sentence_chars = max_sentence_chars
+        self.decay = decay
+        self.turns = 0
+        # (turn, role, sentence, score)
+        self.sentences: List[Tuple[int, str, str, float]] = []
+        self.terms: Counter = Counter()
+    
+    def fold(self, message: Dict[str, Any]):
+        """Absorb one evicted message"""
+        self.turns += 1
+        words = self._words(message.get("content", ""))
+        self.terms.update(words)
+        if len(self.terms) > self.max_topics * 16:
+            self.terms = Counter(dict(self.terms.most_common(self.max_topics * 8)))
+        
+        best = self._best_sentence(message.get("role", "user"), message.get("content", ""))
+        if best is None:
+            return
+        self.sentences.append((self.turns, message.get("role", "user"), *best))
+        if len(self.sentences) > self.max_sentences:
+            weakest = min(self.sentences, key=self._weight)
+            self.sentences.remove(weakest)
+    
+    def render(self) -> str:
+        """The summary as prompt text, or "" before anything was folded"""
+        if not self.turns:
+            return ""
+        lines = [f"Earlier conversation ({self.turns} messages summarized)."]
+        topics = self.topics()
+        if topics:
+            lines.append(f"Topics: {', '.join(topics)}.")
+        for _, role, sentence, _ in self.sentences:
+            lines.append(f"- {role}: {sentence}")
+        return "\n".join(lines)
+    
+    def topics(self) -> List[str]:
+        return [term for term, count in self.terms.most_common(self.max_topics) if count > 1 or self.turns <= 2]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "topics": self.topics(),
+            "key_points": [{"role": role, "text": sentence} for _, role, sentence, _ in self.sentences]
+        }
+    
+    def _weight(self, entry: Tuple[int, str, str, float]) -> float:
+        turn, _, _, score = entry
+        return score - self.decay * (self.turns - turn)
+    
+    def _best_sentence(self, role: str, content: str) -> Optional[Tuple[str, float]]:
+        best = None
+        for sentence in SENTENCE_SPLIT.split(content.strip()):
+            sentence = sentence.strip(" -*#>\t")
+            words = self._words(sentence)
+            if len(words) < 2:
+                continue
+            # Favour dense sentences, concrete values and names; user turns carry the intent
+            score = len(set(words)) ** 0.5
+            score += 0.5 * sum(1 for w in words if w[0].isdigit())
+            score += 0.3 * sum(1 for w in WORD.findall(sentence)[1:] if w[0].isupper())
+            if role == "user":
+                score += 1.0
+            if best is None or score > best[1]:
+                best = (sentence, score)
+        if best is not None and len(best[0]) > self.max_sentence_chars:
+            best = (best[0][:self.max_sentence_chars - 1].rstrip() + "…", best[1])
+        return best
+    
+    def _words(self, text: str) -> List[str]:
+        return [w for w in (m.lower() for m in WORD.findall(text)) if w[0].isdigit() or (len(w) > 2 and w not in STOPWORDS)]
+
+
+class ConversationHistory:
+    """
+    Ring buffer of the last max_messages messages. Messages pushed out of
+    the buffer are folded into the rolling summary.
+    """
+    
+    def __init__(self, max_messages: Optional[int] = None, summary: Optional[RollingSummary] = None):
+        if max_messages is None:
+            max_messages = int(os.getenv("AGENT_HISTORY_SIZE", "20"))
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=max(max_messages, 1))
+        self.summary = summary or RollingSummary()
+    
+    def append(self, message: Dict[str, Any]):
+        if len(self.messages) == self.messages.maxlen:
+            self.summary.fold(self.messages[0])
+        self.messages.append(message)
+    
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """The last count messages, oldest first"""
+        count = min(max(count, 0), len(self.messages))
+        return [self.messages[i] for i in range(len(self.messages) - count, len(self.messages))]
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.messages)
+    
+    def __len__(self) -> int:
+        return len(self.messages)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.messages)[index]
+        return self.messages[index]
@@ -5,12 +5,13 @@ Advanced tools for web search, file operations, and code execution
 
 import os
 import json
-import subprocess
+import asyncio
 import tempfile
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 import httpx
-from app.core.tools import Tool, ToolParameter, ToolMetadata, tool_registry
+from app.core.tools import Tool, ToolParameter, ToolMetadata, format_number, tool_registry
+from app.services.deadline import remaining_timeout
 
 
 class WebSearchTool(Tool):
@@ -44,7 +45,8 @@ class WebSearchTool(Tool):
         try:
             from app.services.web_search import web_search_service
             
-            result = web_search_service.search(query, max_results=num_results)
+            # The search client is blocking: keep it off the event loop
+            result = await asyncio.to_thread(web_search_service.search, query, max_results=num_results)
             
             if result["success"]:
                 return {
@@ -80,7 +82,8 @@ class FileOperationsTool(Tool):
                     name="operation",
                     type="string",
                     description="Operation to perform: 'read', 'write', 'list'",
-                    required=True
+                    required=True,
+                    enum=["read", "write", "list"]
                 ),
                 ToolParameter(
                     name="path",
@@ -178,6 +181,19 @@ class FileOperationsTool(Tool):
                 "success": False,
                 "error": str(e)
             }
+    
+    def format_output(self, output: Any, parameters: Dict[str, Any]) -> Optional[str]:
+        name = Path(output["path"]).name
+        if output["operation"] == "list":
+            if not output["files"]:
+                return "The workspace is empty."
+            lines = [f"- {f['name']} ({f['size']} bytes)" if f["type"] == "file" else f"- {f['name']}/" for f in output["files"]]
+            return f"Workspace files ({output['total']}):\n" + "\n".join(lines)
+        if output["operation"] == "write":
+            return f"Wrote {output['bytes_written']} bytes to {name}."
+        if output["operation"] == "read":
+            return f"Contents of {name}:\n{output['content']}"
+        return None
 
 
 class CodeExecutionTool(Tool):
@@ -214,33 +230,41 @@ class CodeExecutionTool(Tool):
                 f.write(code)
                 temp_file = f.name
             
+            process = None
             try:
-                # Execute the code with timeout
-                result = subprocess.run(
-                    ['python3.11', temp_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout
+                # Execute the code with timeout (no longer than the request has left),
+                # without blocking the event loop while it runs
+                timeout = remaining_timeout(timeout, "code execution")
+                process = await asyncio.create_subprocess_exec(
+                    'python3.11', temp_file,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
                 )
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    return {
+                        "success": False,
+                        "error": f"Code execution timed out after {timeout:g} seconds"
+                    }
                 
                 return {
-                    "success": result.returncode == 0,
+                    "success": process.returncode == 0,
                     "output": {
-                        "stdout": result.stdout,
-                        "stderr": result.stderr,
-                        "returncode": result.returncode
+                        "stdout": stdout.decode(errors="replace"),
+                        "stderr": stderr.decode(errors="replace"),
+                        "returncode": process.returncode
                     }
                 }
             
             finally:
+                # Stop the code if it timed out or the request was cancelled
+                if process is not None and process.returncode is None:
+                    process.kill()
+                    await process.wait()
                 # Clean up temp file
                 os.unlink(temp_file)
         
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "error": f"Code execution timed out after {timeout} seconds"
-            }
         except Exception as e:
             return {
                 "success": False,
@@ -248,6 +272,9 @@ class CodeExecutionTool(Tool):
             }
 
 
+ANALYSIS_LABELS = {"sum": "Sum", "average": "Average", "max": "Max", "min": "Min", "count": "Count"}
+
+
 class DataAnalysisTool(Tool):
     """Tool for analyzing data and creating visualizations"""
     
@@ -261,13 +288,15 @@ class DataAnalysisTool(Tool):
                     name="operation",
                     type="string",
                     description="Operation: 'sum', 'average', 'max', 'min', 'count'",
-                    required=True
+                    required=True,
+                    enum=["sum", "average", "max", "min", "count"]
                 ),
                 ToolParameter(
                     name="data",
                     type="array",
                     description="Array of numbers to analyze",
-                    required=True
+                    required=True,
+                    items="number"
                 )
             ]
         )
@@ -315,6 +344,11 @@ class DataAnalysisTool(Tool):
                 "success": False,
                 "error": str(e)
             }
+    
+    def format_output(self, output: Any, parameters: Dict[str, Any]) -> Optional[str]:
+        label = ANALYSIS_LABELS.get(output["operation"], output["operation"])
+        data = ", ".join(format_number(n) for n in parameters.get("data", []))
+        return f"{label} of {data}: {format_number(output['result'])}"
 
 
 # Register all enhanced tools
@@ -8,6 +8,7 @@ from typing import Callable, Any, Optional, Dict
 from functools import wraps
 import time
 import traceback
+from app.services.tracing import tracer
 
 
 class ErrorRecoverySystem:
@@ -37,11 +38,11 @@ class ErrorRecoverySystem:
                         last_exception = e
                         
                         if attempt < retries - 1:
-                            print(f"[ErrorRecovery] Attempt {attempt + 1} failed: {e}. Retrying in {retry_delay}s...")
+                            tracer.event("recovery.retry", function=func.__name__, attempt=attempt + 1, error=str(e), delay=retry_delay)
                             await asyncio.sleep(retry_delay)
                             retry_delay *= 2  # Exponential backoff
                         else:
-                            print(f"[ErrorRecovery] All {retries} attempts failed")
+                            tracer.event("recovery.retries_exhausted", function=func.__name__, attempts=retries, error=str(e))
                 
                 # All retries failed
                 raise last_exception
@@ -57,11 +58,11 @@ class ErrorRecoverySystem:
                 try:
                     return await func(*args, **kwargs)
                 except Exception as e:
-                    print(f"[ErrorRecovery] Primary function failed: {e}. Using fallback...")
+                    tracer.event("recovery.fallback", function=func.__name__, error=str(e))
                     try:
                         return await fallback_func(*args, **kwargs)
                     except Exception as fallback_error:
-                        print(f"[ErrorRecovery] Fallback also failed: {fallback_error}")
+                        tracer.event("recovery.fallback_failed", function=func.__name__, error=str(fallback_error))
                         raise e  # Raise original error
             
             return wrapper
@@ -108,7 +109,7 @@ class ErrorRecoverySystem:
                     if breaker["failures"] >= self.circuit_breaker_threshold:
                         breaker["state"] = "open"
                         breaker["opened_at"] = time.time()
-                        print(f"[ErrorRecovery] Circuit breaker opened for {service_name}")
+                        tracer.event("recovery.circuit_open", service=service_name, failures=breaker["failures"])
                     
                     raise e
             
@@ -120,7 +121,7 @@ class ErrorRecoverySystem:
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            print(f"[ErrorRecovery] Safe execution failed: {e}")
+            tracer.event("recovery.safe_execute_failed", function=getattr(func, "__name__", repr(func)), error=str(e))
             return default_value
     
     async def safe_execute_async(self, func: Callable, *args, default_value: Any = None, **kwargs) -> Any:
@@ -128,7 +129,7 @@ class ErrorRecoverySystem:
         try:
             return await func(*args, **kwargs)
         except Exception as e:
-            print(f"[ErrorRecovery] Safe async execution failed: {e}")
+            tracer.event("recovery.safe_execute_failed", function=getattr(func, "__name__", repr(func)), error=str(e))
             return default_value
     
     def get_error_context(self, error: Exception) -> Dict[str, Any]:
@@ -148,7 +149,7 @@ class ErrorRecoverySystem:
                 "failures": 0,
                 "opened_at": None
             }
-            print(f"[ErrorRecovery] Circuit breaker reset for {service_name}")
+            tracer.event("recovery.circuit_reset", service=service_name)
     
     def get_status(self) -> Dict[str, Any]:
         """Get status of all circuit breakers"""
@@ -0,0 +1,255 @@
+"""
+Project Alfred - Event Bus
+In-process async publish/subscribe with bounded, batched consumer queues
+"""
+
+import os
+import time
+import asyncio
+import contextvars
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from app.services.llm_metrics import Histogram
+from app.services.tracing import tracer
+
+
+# Publish-to-handle lag bucket upper bounds in seconds
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# What publish does when a subscriber's queue is full
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+# Longest wait between retries of a failed batch, in seconds
+MAX_RETRY_BACKOFF = 10.0
+
+BatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class Subscriber:
+    """
+    One consumer of a topic: a bounded queue drained by a single worker
+    that hands the handler up to batch_size events at a time, waiting at
+    most flush_interval for a batch to fill. A batch whose handler raises
+    is retried up to `retries` times with exponential backoff (so the
+    handler must tolerate seeing a batch again) before it counts as failed.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        handler: BatchHandler,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow: str,
+        retries: int = 0,
+        retry_backoff: float = 0.1
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.name = name
+        self.handler = handler
+        self.max_queue = max(max_queue, 1)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.retries = max(retries, 0)
+        self.retry_backoff = retry_backoff
+        self.queue: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self.lag = Histogram(LAG_BUCKETS)
+        self.stats = {
+            "published": 0,
+            "processed": 0,
+            "dropped": 0,
+            "failed": 0,
+            "retries": 0,
+            "batches": 0,
+            "max_depth": 0
+        }
+        self._nonempty: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Enqueue without waiting; a full queue applies the drop policy ("block" drops the new event)"""
+        self._ensure_worker()
+        if len(self.queue) >= self.max_queue:
+            self.stats["dropped"] += 1
+            if self.overflow != "drop_oldest":
+                return False
+            self.queue.popleft()
+        self._enqueue(event)
+        return True
+    
+    async def put(self, event: Dict[str, Any]) -> bool:
+        """Enqueue, waiting for space when the policy is "block" """
+        self._ensure_worker()
+        while self.overflow == "block" and len(self.queue) >= self.max_queue:
+            self._space.clear()
+            await self._space.wait()
+        return self.offer(event)
+    
+    async def drain(self, timeout: float):
+        """Wait until everything queued so far has been handled"""
+        if self._worker is None or self._loop is not asyncio.get_running_loop():
+            return
+        self._ready.set()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            tracer.event("event_bus.drain_timeout", subscriber=self.name, queued=len(self.queue), timeout=timeout)
+    
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "depth": len(self.queue),
+            "max_queue": self.max_queue,
+            "overflow": self.overflow,
+            "lag": self.lag.to_dict()
+        }
+    
+    def _enqueue(self, event: Dict[str, Any]):
+        self.queue.append((time.perf_counter(), event))
+        self.stats["published"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self.queue))
+        self._idle.clear()
+        self._nonempty.set()
+        if len(self.queue) >= self.batch_size:
+            self._ready.set()
+    
+    def _ensure_worker(self):
+        # Bound lazily to the running loop (and rebound if a new loop took over)
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and self._loop is loop:
+            return
+        self._loop = loop
+        self._nonempty = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._idle = asyncio.Event()
+        if not self.queue:
+            self._idle.set()
+        # A fresh context, so the worker does not keep the first publisher's span and deadline
+        self._worker = loop.create_task(self._run(), context=contextvars.Context())
+    
+    async def _run(self):
+        while True:
+            if not self.queue:
+                self._idle.set()
+                self._nonempty.clear()
+                await self._nonempty.wait()
+            if len(self.queue) < self.batch_size and self.flush_interval > 0:
+                # Give a partial batch a moment to fill
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            
+            batch = []
+            now = time.perf_counter()
+            while self.queue and len(batch) < self.batch_size:
+                published_at, event = self.queue.popleft()
+                self.lag.observe(now - published_at)
+                batch.append(event)
+            self._space.set()
+            if not batch:
+                continue
+            
+            await self._handle(batch)
+            self.stats["batches"] += 1
+    
+    async def _handle(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.retries + 1):
+            try:
+                await self.handler(batch)
+                self.stats["processed"] += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self.stats["failed"] += len(batch)
+                    tracer.event("event_bus.handler_failed", subscriber=self.name, batch=len(batch), attempts=attempt + 1, error=str(e))
+                    return
+                self.stats["retries"] += 1
+                tracer.event("event_bus.handler_retry", subscriber=self.name, batch=len(batch), attempt=attempt + 1, error=str(e))
+                await asyncio.sleep(min(self.retry_backoff * 2 ** attempt, MAX_RETRY_BACKOFF))
+
+
+class EventBus:
+    """
+    Topic-based publish/subscribe for side effects that should not delay a
+    response. Each subscriber has its own bounded queue and worker, so a
+    slow consumer never holds up the publisher or the other consumers.
+    """
+    
+    def __init__(self):
+        self.topics: Dict[str, List[Subscriber]] = {}
+        self.drain_timeout = float(os.getenv("EVENT_BUS_DRAIN_TIMEOUT", "5"))
+    
+    def subscribe(
+        self,
+        topic: str,
+        name: str,
+        handler: BatchHandler,
+        max_queue: Optional[int] = None,
+        batch_size: int = 32,
+        flush_interval: float = 0.05,
+        overflow: str = "drop_oldest",
+        retries: int = 0,
+        retry_backoff: float = 0.1
+    ) -> Subscriber:
+        """Register a batch handler for topic"""
+        if max_queue is None:
+            max_queue = int(os.getenv("EVENT_BUS_MAX_QUEUE", "1000"))
+        subscriber = Subscriber(name, handler, max_queue, batch_size, flush_interval, overflow, retries, retry_backoff)
+        self.topics.setdefault(topic, []).append(subscriber)
+        return subscriber
+    
+    def publish_nowait(self, topic: str, payload: Dict[str, Any]) -> int:
+        """Hand payload to every subscriber without waiting; returns how many accepted it"""
+        return sum(subscriber.offer(payload) for subscriber in self.topics.get(topic, []))
+    
+    async def publish(self, topic: str, payload: Dict[str, Any]) -> int:
+        """Like publish_nowait, but waits for space at "block" subscribers"""
+        accepted = 0
+        for subscriber in self.topics.get(topic, []):
+            accepted += await subscriber.put(payload)
+        return accepted
+    
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait for every subscriber to handle what has been published so far"""
+        timeout = self.drain_timeout if timeout is None else timeout
+        await asyncio.gather(*(
+            subscriber.drain(timeout)
+            for subscribers in self.topics.values()
+            for subscriber in subscribers
+        ))
+    
+    async def shutdown(self):
+        """Flush queued events, then stop the workers"""
+        await self.flush()
+        await asyncio.gather(*(
+            subscriber.stop()
+            for subscribers in self.topics.values()
+            for subscriber in subscribers
+        ))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-subscriber throughput, drops, queue depth and publish-to-handle lag"""
+        return {
+            topic: {subscriber.name: subscriber.get_stats() for subscriber in subscribers}
+            for topic, subscribers in self.topics.items()
+        }
+
+
+# Global event bus instance
+event_bus = EventBus()
@@ -0,0 +1,243 @@
+"""
+Project Alfred - Fast Path Router
+Deterministic local routing for trivially routable requests (no LLM round trips)
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.tools import tool_registry
+
+
+NUMBER = r"-?\d+(?:\.\d+)?"
+NUMBER_LIST = rf"{NUMBER}(?:\s*(?:,|and|\s)\s*{NUMBER})+"
+
+CALC_OPERATORS = {
+    "+": "add", "plus": "add",
+    "-": "subtract", "minus": "subtract",
+    "*": "multiply", "x": "multiply", "×": "multiply", "times": "multiply", "multiplied by": "multiply",
+    "/": "divide", "÷": "divide", "over": "divide", "divided by": "divide"
+}
+CALC_SYMBOLS = {"add": "+", "subtract": "-", "multiply": "×", "divide": "÷"}
+OPERATOR_PATTERN = "|".join(
+    re.escape(op) for op in sorted(CALC_OPERATORS, key=len, reverse=True)
+)
+
+STAT_OPERATIONS = {
+    "sum": "sum", "total": "sum",
+    "average": "average", "mean": "average", "avg": "average",
+    "max": "max", "maximum": "max", "largest": "max", "highest": "max",
+    "min": "min", "minimum": "min", "smallest": "min", "lowest": "min",
+    "count": "count"
+}
+STAT_PATTERN = "|".join(sorted(STAT_OPERATIONS, key=len, reverse=True))
+STAT_LABELS = {"sum": "Sum", "average": "Average", "max": "Max", "min": "Min", "count": "Count"}
+
+# Requests are normalised (lowercased, trailing punctuation/politeness removed) before matching
+CALC_EXPRESSION = re.compile(
+    rf"^(?:what(?:'s| is)|whats|calculate|compute|how much is|solve)?\s*"
+    rf"(?P<a>{NUMBER})\s*(?P<op>{OPERATOR_PATTERN})\s*(?P<b>{NUMBER})$"
+)
+CALC_VERB = re.compile(
+    rf"^(?P<verb>add|subtract|multiply|divide)\s+(?P<x>{NUMBER})\s+(?:and|by|from|to|with)\s+(?P<y>{NUMBER})$"
+)
+CALC_EMBEDDED = re.compile(
+    rf"(?<![\w.])(?P<a>{NUMBER})\s*(?P<op>[+\-*/×÷])\s*(?P<b>{NUMBER})(?![\w.])"
+)
+STAT_REQUEST = re.compile(
+    rf"^(?:what(?:'s| is) the|whats the|calculate the|compute the|find the|give me the|get the)?\s*"
+    rf"(?P<op>{STAT_PATTERN})\s+(?:of|for)\s+(?:(?:these|the|the following)\s+(?:numbers|values|data)\s*)?:?\s*"
+    rf"(?P<data>{NUMBER_LIST})$"
+)
+ANALYZE_REQUEST = re.compile(
+    rf"^analy[sz]e\s+(?:these|the|the following|this)?\s*(?:numbers|values|data)\s*:?\s*"
+    rf"(?P<data>{NUMBER_LIST})$"
+)
+# Only explicit commands: "echo: ...", echo "..." or "repeat after me ...". A bare
+# leading "echo" is too often just a word ("Echo chamber effects ...")
+ECHO_REQUEST = re.compile(
+    r"^(?:echo\s*:|repeat after me\s*:?)\s*(?P<message>\S.*)$"
+    r"|^echo\s+(?:\"(?P<double>.+)\"|'(?P<single>.+)'|“(?P<curly>.+)”)$",
+    re.IGNORECASE | re.DOTALL
+)
+
+TRAILING_NOISE = re.compile(r"(?:\s*(?:please|thanks|thank you))*[\s?.!]*$")
+
+
+def _to_number(text: str) -> float:
+    """Parse a number, keeping integers as int so results render cleanly"""
+    value = float(text)
+    return int(value) if value.is_integer() and "." not in text else value
+
+
+def _parse_numbers(text: str) -> List[float]:
+    return [_to_number(n) for n in re.findall(NUMBER, text)]
+
+
+def _display(value: Any) -> Any:
+    """Drop the trailing .0 from whole floats and trim float noise (recursively) for display"""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, 6)
+    if isinstance(value, dict):
+        return {k: _display(v) for k, v in value.items()}
+    return value
+
+
+def render_template(template: str, results: List[Dict[str, Any]]) -> str:
+    """Fill a format_response template; {sN} refers to the output of step N"""
+    outputs = {f"s{r['step']}": _display(r.get("output")) for r in results}
+    return template.format_map(outputs)
+
+
+class FastPathRouter:
+    """
+    Recognises calculator, data analysis and echo requests with compiled
+    grammars and builds the analysis and plan locally
+    """
+    
+    def __init__(self, min_confidence: Optional[float] = None):
+        if min_confidence is None:
+            min_confidence = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+        self.min_confidence = min_confidence
+        self.stats = {
+            "total": 0,
+            "fast_path": 0,
+            "low_confidence": 0,
+            "no_match": 0,
+            "routes": {}
+        }
+    
+    def route(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """
+        Return {"analysis": ..., "plan": [...], "confidence": float} when the
+        request can be handled locally, or None if the LLM should take over
+        """
+        self.stats["total"] += 1
+        
+        match = self._match(user_input)
+        if match is None:
+            self.stats["no_match"] += 1
+            return None
+        
+        route_name, confidence, analysis, plan = match
+        if confidence < self.min_confidence:
+            self.stats["low_confidence"] += 1
+            return None
+        
+        # Only route to tools that are actually registered in this process
+        for step in plan:
+            if step["action"] == "use_tool" and not tool_registry.get_tool(step["tool"]):
+                self.stats["no_match"] += 1
+                return None
+        
+        self.stats["fast_path"] += 1
+        self.stats["routes"][route_name] = self.stats["routes"].get(route_name, 0) + 1
+        
+        analysis.update({
+            "complexity": "simple",
+            "summary": user_input[:100],
+            "route": "fast_path",
+            "route_confidence": confidence
+        })
+        return {"analysis": analysis, "plan": plan, "confidence": confidence}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing counters and the share of traffic served locally"""
+        total = self.stats["total"]
+        return {
+            **self.stats,
+            "routes": dict(self.stats["routes"]),
+            "fast_path_ratio": self.stats["fast_path"] / total if total else 0.0
+        }
+    
+    def _match(self, user_input: str) -> Optional[Tuple[str, float, Dict[str, Any], List[Dict[str, Any]]]]:
+        raw = user_input.strip()
+        
+        echo = ECHO_REQUEST.match(raw)
+        if echo:
+            message = next(m for m in echo.group("message", "double", "single", "curly") if m is not None)
+            return "echo", 1.0, self._analysis("echo_message", [message]), [
+                self._tool_step(1, "echo", {"message": message}, "Echo the message back"),
+                self._format_step(2, "{s1}")
+            ]
+        
+        text = TRAILING_NOISE.sub("", raw.lower())
+        
+        calc = CALC_EXPRESSION.match(text)
+        if calc:
+            return self._calculation("calculator", 1.0, calc.group("a"), CALC_OPERATORS[calc.group("op")], calc.group("b"))
+        
+        verb = CALC_VERB.match(text)
+        if verb:
+            operation = verb.group("verb")
+            a, b = verb.group("x"), verb.group("y")
+            if operation == "subtract" and " from " in text:
+                a, b = b, a  # "subtract 5 from 10" is 10 - 5
+            return self._calculation("calculator_verb", 1.0, a, operation, b)
+        
+        stat = STAT_REQUEST.match(text)
+        if stat:
+            operation = STAT_OPERATIONS[stat.group("op")]
+            data = _parse_numbers(stat.group("data"))
+            return "data_analysis", 1.0, self._analysis("analyze_data", data), [
+                self._tool_step(1, "data_analysis", {"operation": operation, "data": data}, f"Compute the {operation}"),
+                self._format_step(2, f"{STAT_LABELS[operation]} of {self._join(data)}: {{s1[result]}}")
+            ]
+        
+        analyze = ANALYZE_REQUEST.match(text)
+        if analyze:
+            data = _parse_numbers(analyze.group("data"))
+            operations = ["count", "sum", "average", "min", "max"]
+            steps = [
+                self._tool_step(i, "data_analysis", {"operation": op, "data": data}, f"Compute the {op}")
+                for i, op in enumerate(operations, 1)
+            ]
+            summary = ", ".join(f"{STAT_LABELS[op]}: {{s{i}[result]}}" for i, op in enumerate(operations, 1))
+            steps.append(self._format_step(len(steps) + 1, f"Analysis of {self._join(data)} - {summary}"))
+            return "data_analysis_summary", 0.95, self._analysis("analyze_data", data), steps
+        
+        # An arithmetic expression buried in a longer sentence is a weak signal
+        embedded = CALC_EMBEDDED.search(text)
+        if embedded:
+            return self._calculation("calculator_embedded", 0.6, embedded.group("a"), CALC_OPERATORS[embedded.group("op")], embedded.group("b"))
+        
+        return None
+    
+    def _calculation(self, route_name: str, confidence: float, a: str, operation: str, b: str):
+        a_value, b_value = _to_number(a), _to_number(b)
+        return route_name, confidence, self._analysis("perform_calculation", [a_value, b_value]), [
+            self._tool_step(1, "calculator", {"operation": operation, "a": a_value, "b": b_value}, f"Compute {a} {CALC_SYMBOLS[operation]} {b}"),
+            self._format_step(2, f"{a} {CALC_SYMBOLS[operation]} {b} = {{s1}}")
+        ]
+    
+    def _analysis(self, intent: str, entities: List[Any]) -> Dict[str, Any]:
+        return {
+            "intent": intent,
+            "entities": entities,
+            "requires_tools": True
+        }
+    
+    def _tool_step(self, number: int, tool: str, parameters: Dict[str, Any], description: str) -> Dict[str, Any]:
+        return {
+            "step": number,
+            "action": "use_tool",
+            "tool": tool,
+            "description": description,
+            "parameters": parameters
+        }
+    
+    def _format_step(self, number: int, template: str) -> Dict[str, Any]:
+        return {
+            "step": number,
+            "action": "format_response",
+            "tool": None,
+            "description": "Render the tool results for the user",
+            "template": template
+        }
+    
+    def _join(self, data: List[float]) -> str:
+        return ", ".join(str(n) for n in data)
+
+
+# Global fast path router instance
+fast_path_router = FastPathRouter()
@@ -0,0 +1,205 @@
+"""
+Project Alfred - Background Jobs
+Bounded worker pool running agent tasks outside the request that submitted them
+"""
+
+import os
+import uuid
+import asyncio
+import contextvars
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are waiting for a worker"""
+    
+    def __init__(self, pending: int):
+        super().__init__(f"Too many background jobs pending ({pending})")
+        self.pending = pending
+
+
+FINISHED_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+@dataclass
+class Job:
+    """A submitted background task and its outcome"""
+    user_id: str
+    run: Callable[[], Awaitable[Dict[str, Any]]]
+    on_discard: Optional[Callable[[], None]] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs submitted jobs on at most `workers` concurrent workers, with at
+    most `max_pending` jobs waiting. Cancelling a running job cancels its
+    coroutine, which propagates into the in-flight LLM and tool calls.
+    The most recent `retention` jobs are kept for polling.
+    """
+    
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        retention: Optional[int] = None
+    ):
+        self.workers = max(workers or int(os.getenv("AGENT_JOB_WORKERS", "4")), 1)
+        self.max_pending = max_pending or int(os.getenv("AGENT_JOB_MAX_PENDING", "100"))
+        self.retention = retention or int(os.getenv("AGENT_JOB_RETENTION", "1000"))
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "cancelled": 0
+        }
+    
+    def submit(
+        self,
+        user_id: str,
+        run: Callable[[], Awaitable[Dict[str, Any]]],
+        on_discard: Optional[Callable[[], None]] = None
+    ) -> Job:
+        """
+        Queue run() for a worker. on_discard is called if the job is
+        cancelled before it starts (e.g. to release a reserved queue place).
+        Raises JobQueueFullError when max_pending jobs are already waiting.
+        """
+        self._ensure_workers()
+        if self._queue.qsize() >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise JobQueueFullError(self._queue.qsize())
+        
+        job = Job(user_id=user_id, run=run, on_discard=on_discard)
+        self.jobs[job.id] = job
+        self._prune()
+        self._queue.put_nowait(job)
+        self.stats["submitted"] += 1
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+    
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.status == "queued":
+            # The worker skips it when it comes up
+            self._finish(job, "cancelled")
+            if job.on_discard:
+                job.on_discard()
+        elif job._task is not None:
+            job._task.cancel()
+        return job
+    
+    async def shutdown(self):
+        """Cancel running jobs and stop the workers"""
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job counters and current pool usage"""
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "running": sum(1 for job in self.jobs.values() if job.status == "running"),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_pending": self.max_pending
+        }
+    
+    def _ensure_workers(self):
+        # Created lazily so the queue and workers bind to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            # Fresh contexts, so workers (and the jobs they start) do not keep the first submitter's span and deadline
+            self._workers = [asyncio.create_task(self._worker(), context=contextvars.Context()) for _ in range(self.workers)]
+    
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "queued":
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+    
+    async def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = datetime.now()
+        job._task = asyncio.create_task(job.run())
+        try:
+            job.result = await asyncio.shield(job._task)
+        except asyncio.CancelledError:
+            if not job._task.cancelled():
+                # The worker itself is shutting down
+                job._task.cancel()
+                self._finish(job, "cancelled")
+                raise
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, "failed")
+        else:
+            if job.result.get("status") == "success":
+                self._finish(job, "succeeded")
+            else:
+                job.error = job.result.get("error", "Unknown error")
+                self._finish(job, "failed")
+        finally:
+            job._task = None
+    
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = datetime.now()
+        job.done.set()
+        self.stats[status] += 1
+    
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - self.retention
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:excess]:
+            del self.jobs[job_id]
+
+
+# Global job manager instance
+job_manager = JobManager()
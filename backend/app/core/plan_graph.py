@@ -0,0 +1,133 @@
+"""
+Project Alfred - Plan Dependency Graph
+Dependency edges between plan steps, explicit or inferred from step references
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set
+from app.core.fast_path import render_template
+
+
+# {s2} or {s2[result]} refers to the output of step 2 (same syntax as format_response templates)
+STEP_REFERENCE = re.compile(r"\{s(\d+)(?:\[[^\]]*\])*\}")
+WHOLE_REFERENCE = re.compile(r"^\{s(\d+)\}$")
+
+# Actions that consume every earlier result
+AGGREGATING_ACTIONS = {"generate_response"}
+INDEPENDENT_ACTIONS = {"use_tool", "format_response"}
+
+
+def step_number(value: Any) -> Optional[int]:
+    """A step number as the model wrote it (2, 2.0 or "2"), or None if it is not one"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def step_references(value: Any) -> Set[int]:
+    """Step numbers referenced anywhere inside value"""
+    if isinstance(value, str):
+        return {int(n) for n in STEP_REFERENCE.findall(value)}
+    if isinstance(value, dict):
+        return set().union(*(step_references(v) for v in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(step_references(v) for v in value)) if value else set()
+    return set()
+
+
+def build_dependencies(plan: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    For each step (by position), the positions of the earlier steps it
+    depends on. generate_response depends on everything before it, as does
+    any unknown action without explicit "depends_on". Tool and format steps
+    depend on their explicit "depends_on" steps plus every step they
+    reference, so a {sN} is always resolved before the step runs. Edges
+    only ever point backwards, so the graph is acyclic. Step numbers
+    written as strings count; entries that are not numbers are ignored.
+    """
+    positions: Dict[int, int] = {}
+    dependencies = []
+    for index, step in enumerate(plan):
+        action = step.get("action")
+        explicit = step.get("depends_on")
+        if action in AGGREGATING_ACTIONS:
+            numbers = None
+        elif action in INDEPENDENT_ACTIONS:
+            numbers = step_references(step.get("parameters")) | step_references(step.get("template"))
+        elif isinstance(explicit, list):
+            numbers = set()
+        else:
+            numbers = None
+        if numbers is not None and isinstance(explicit, list):
+            numbers |= {step_number(n) for n in explicit} - {None}
+        
+        if numbers is None:
+            deps = list(range(index))
+        else:
+            deps = sorted(positions[n] for n in numbers if n in positions)
+        dependencies.append(deps)
+        
+        number = step_number(step.get("step"))
+        if number is not None:
+            positions.setdefault(number, index)
+    return dependencies
+
+
+def resolve_references(parameters: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Substitute step outputs into tool parameters: a value that is exactly
+    "{sN}" becomes step N's raw output, other strings are rendered as templates
+    """
+    outputs = {step_number(r["step"]): r.get("output") for r in results if "step" in r}
+    
+    def resolve(value: Any) -> Any:
+        if isinstance(value, str):
+            whole = WHOLE_REFERENCE.match(value)
+            if whole and int(whole.group(1)) in outputs:
+                return outputs[int(whole.group(1))]
+            if STEP_REFERENCE.search(value):
+                try:
+                    return render_template(value, results)
+                except (KeyError, IndexError, TypeError, ValueError):
+                    return value
+            return value
+        if isinstance(value, dict):
+            return {k: resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [resolve(v) for v in value]
+        return value
+    
+    return resolve(parameters)
+
+
+# Example usage
+if __name__ == "__main__":
+    # Step numbers and depends_on entries often arrive as strings
+    plan = [
+        {"step": "1", "action": "use_tool", "tool": "calculator", "parameters": {"operation": "add", "a": 2, "b": 3}},
+        {"step": "2", "action": "use_tool", "tool": "echo", "parameters": {"message": "{s1}"}, "depends_on": ["1", {"step": 1}, [1]]},
+        {"step": 3, "action": "use_tool", "tool": "echo", "parameters": {"message": "{s2}"}}
+    ]
+    dependencies = build_dependencies(plan)
+    print(f"Dependencies: {dependencies}")
+    assert dependencies == [[], [0], [1]], dependencies
+    
+    # generate_response waits for every earlier step, whatever depends_on says,
+    # and a referenced step is waited for even when depends_on leaves it out
+    mixed_plan = [
+        {"step": 1, "action": "use_tool", "tool": "calculator", "parameters": {"operation": "add", "a": 2, "b": 3}},
+        {"step": 2, "action": "use_tool", "tool": "calculator", "parameters": {"operation": "add", "a": 1, "b": 1}},
+        {"step": 3, "action": "format_response", "template": "{s1} and {s2}", "depends_on": [2]},
+        {"step": 4, "action": "generate_response", "depends_on": []}
+    ]
+    dependencies = build_dependencies(mixed_plan)
+    print(f"Dependencies: {dependencies}")
+    assert dependencies == [[], [], [0, 1], [0, 1, 2]], dependencies
+    
+    resolved = resolve_references(plan[1]["parameters"], [{"step": "1", "output": 5}])
+    print(f"Resolved: {resolved}")
+    assert resolved == {"message": 5}, resolved
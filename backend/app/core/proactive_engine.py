@@ -6,6 +6,7 @@ Intelligent suggestion and anticipation system
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from app.core.digital_twin import digital_twin, UserProfile
+from app.core.event_bus import event_bus
 
 
 class Suggestion:
@@ -52,6 +53,7 @@ class ProactiveEngine:
     def __init__(self):
         self.pending_suggestions: Dict[str, List[Suggestion]] = {}
         self.suggestion_history: Dict[str, List[Suggestion]] = {}
+        self.latest_suggestions: Dict[str, List[Suggestion]] = {}
     
     def generate_suggestions(self, user_id: str, current_context: Optional[Dict[str, Any]] = None) -> List[Suggestion]:
         """Generate proactive suggestions for a user"""
@@ -85,9 +87,22 @@ class ProactiveEngine:
         if user_id not in self.pending_suggestions:
             self.pending_suggestions[user_id] = []
         self.pending_suggestions[user_id].extend(suggestions)
+        self.latest_suggestions[user_id] = suggestions
         
         return suggestions
     
+    async def observe_interactions(self, events: List[Dict[str, Any]]):
+        """
+        Event bus consumer for completed interactions: learn from each one,
+        then refresh suggestions once per user with their latest request
+        """
+        latest = {}
+        for event in events:
+            digital_twin.update_profile(event["user_id"], event["interaction"])
+            latest[event["user_id"]] = event["user_input"]
+        for user_id, user_input in latest.items():
+            self.generate_suggestions(user_id, {"current_task": user_input})
+    
     def _suggest_tools(self, profile: UserProfile, context: Dict[str, Any]) -> List[Suggestion]:
         """Suggest tools based on user patterns and context"""
         suggestions = []
@@ -308,3 +323,6 @@ User Context:
 
 # Global proactive engine instance
 proactive_engine = ProactiveEngine()
+
+# Learn from completed interactions in the background (losing a few under overload is acceptable)
+event_bus.subscribe("interaction_completed", "personalization", proactive_engine.observe_interactions)
@@ -0,0 +1,112 @@
+"""
+Project Alfred - Response Composer
+Renders tool results locally and decides when a final LLM generation is needed
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+from app.core.tools import tool_registry
+
+
+# Requests asking for more than the raw result need the model to write prose
+SYNTHESIS_CUES = re.compile(
+    r"\b(?:explain|why|how come|describe|summari[sz]e|compare|recommend|suggest|should|"
+    r"interpret|what does .+ mean|tell me (?:more|about)|in words|step by step)\b",
+    re.IGNORECASE
+)
+
+
+class ResponseComposer:
+    """
+    Composes the user-facing response. A generate_response step that only
+    restates tool results is replaced by the tools' local formatters when
+    every result can be rendered and the request asks for nothing more.
+    """
+    
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("AGENT_COMPOSE_RESPONSES", "true").lower() == "true"
+        self.enabled = enabled
+        self.stats = {
+            "generate_steps": 0,
+            "generate_avoided": 0,
+            "synthesis_required": 0,
+            "unformattable": 0,
+            "deadline_composed": 0
+        }
+    
+    def compose_step(
+        self,
+        user_input: str,
+        complexity: Optional[str],
+        results: List[Dict[str, Any]],
+        prefer_local: bool = False
+    ) -> Optional[str]:
+        """
+        Text to use instead of calling the LLM for a generate_response step
+        that follows results, or None if the step should be generated.
+        prefer_local (the request is short of time) renders the results even
+        when the request asks for more than them.
+        """
+        self.stats["generate_steps"] += 1
+        if not self.enabled or not results:
+            return None
+        synthesis = complexity == "complex" or bool(SYNTHESIS_CUES.search(user_input))
+        if synthesis and not prefer_local:
+            self.stats["synthesis_required"] += 1
+            return None
+        
+        text = self.render(results)
+        if text is None:
+            self.stats["unformattable"] += 1
+            return None
+        self.stats["generate_avoided"] += 1
+        if synthesis:
+            self.stats["deadline_composed"] += 1
+        return text
+    
+    def render(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """Format every result with its tool's formatter, or None if any cannot be"""
+        lines = []
+        for result in results:
+            tool = tool_registry.get_tool(result.get("tool")) if result.get("tool") else None
+            if tool is None or not result.get("success"):
+                return None
+            text = tool.format_output(result.get("output"), result.get("parameters") or {})
+            if text is None:
+                return None
+            lines.append(text)
+        return "\n".join(lines) if lines else None
+    
+    def final_response(self, results: List[Dict[str, Any]]) -> str:
+        """
+        The response for a successful execution: the last step that produced
+        final user-facing text, else the tool results rendered locally, else
+        the last output as text
+        """
+        final = [r for r in results if r.get("final")]
+        if final:
+            return str(final[-1].get("output", ""))
+        
+        rendered = self.render(results)
+        if rendered is not None:
+            return rendered
+        
+        outputs = [r.get("output") for r in results if r.get("output") is not None]
+        if not outputs:
+            return "Task completed successfully."
+        return outputs[-1] if isinstance(outputs[-1], str) else str(outputs[-1])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get composition counters, including generate calls avoided"""
+        steps = self.stats["generate_steps"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "avoided_ratio": self.stats["generate_avoided"] / steps if steps else 0.0
+        }
+
+
+# Global response composer instance
+response_composer = ResponseComposer()
@@ -0,0 +1,84 @@
+"""
+Project Alfred - Speculative Response Generation
+Starts generate_response alongside planning for simple, tool-free requests
+"""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+from app.services.llm_metrics import LLMMetrics
+
+
+class Speculation:
+    """A generate_response call started before the plan was known"""
+    
+    def __init__(self, factory: Callable[[], Awaitable[str]], metrics: LLMMetrics):
+        self.calls: List[Any] = []
+        self.task = asyncio.create_task(self._run(factory, metrics))
+    
+    async def _run(self, factory: Callable[[], Awaitable[str]], metrics: LLMMetrics) -> str:
+        with metrics.capture() as calls:
+            self.calls = calls
+            return await factory()
+
+
+class ResponseSpeculator:
+    """
+    Decides when to speculate, commits or discards speculative responses
+    and tracks the hit rate and the tokens spent on discarded answers
+    """
+    
+    def __init__(self):
+        self.enabled = os.getenv("AGENT_SPECULATIVE_RESPONSE", "true").lower() == "true"
+        self.stats = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "cancelled_inflight": 0,
+            "wasted_prompt_tokens": 0,
+            "wasted_completion_tokens": 0
+        }
+    
+    def should_speculate(self, analysis: Dict[str, Any]) -> bool:
+        """Simple requests that need no tools almost always plan to a single generate_response"""
+        return analysis.get("complexity") == "simple" and not analysis.get("requires_tools")
+    
+    def start(self, factory: Callable[[], Awaitable[str]], metrics: LLMMetrics) -> Speculation:
+        """Run factory() in the background, recording its LLM calls"""
+        self.stats["started"] += 1
+        return Speculation(factory, metrics)
+    
+    def matches(self, plan: List[Dict[str, Any]]) -> bool:
+        """The speculative answer stands in for the plan's first step when no tools run"""
+        return bool(plan) and plan[0].get("action") == "generate_response" and all(
+            step.get("action") != "use_tool" for step in plan
+        )
+    
+    async def commit(self, speculation: Speculation) -> str:
+        """Use the speculative answer"""
+        self.stats["hits"] += 1
+        return await speculation.task
+    
+    def discard(self, speculation: Speculation):
+        """Cancel a speculative answer the plan did not confirm"""
+        self.stats["misses"] += 1
+        if not speculation.task.done():
+            # Cancelled calls report no usage, so their prompt tokens are not counted
+            self.stats["cancelled_inflight"] += 1
+            speculation.task.cancel()
+        for call in speculation.calls:
+            self.stats["wasted_prompt_tokens"] += call.prompt_tokens
+            self.stats["wasted_completion_tokens"] += call.completion_tokens
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get speculation counters and hit rate"""
+        decided = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hit_rate": self.stats["hits"] / decided if decided else 0.0
+        }
+
+
+# Global response speculator instance
+response_speculator = ResponseSpeculator()
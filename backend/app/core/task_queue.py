@@ -0,0 +1,94 @@
+"""
+Project Alfred - Per-Agent Task Queue
+Serializes one user's tasks with a bounded queue depth and back-pressure
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class AgentBusyError(Exception):
+    """Raised when a user's task queue is full"""
+    
+    def __init__(self, user_id: str, depth: int):
+        super().__init__(f"Too many pending tasks for user {user_id} ({depth} queued or running)")
+        self.user_id = user_id
+        self.depth = depth
+
+
+class TaskTicket:
+    """
+    A reserved place in the queue. `async with ticket:` waits for the
+    task's turn and frees the place afterwards; release() frees a ticket
+    that never ran.
+    """
+    
+    def __init__(self, queue: "TaskQueue"):
+        self.queue = queue
+        self.reserved_at = time.perf_counter()
+        self.released = False
+        self._holding = False
+    
+    async def __aenter__(self) -> "TaskTicket":
+        try:
+            await self.queue._lock.acquire()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        self._holding = True
+        self.queue._record_wait(time.perf_counter() - self.reserved_at)
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+    
+    def release(self):
+        if self._holding:
+            self._holding = False
+            self.queue._lock.release()
+        if not self.released:
+            self.released = True
+            self.queue.depth -= 1
+
+
+class TaskQueue:
+    """One task at a time, at most max_depth tasks running or waiting"""
+    
+    def __init__(self, user_id: str, max_depth: Optional[int] = None):
+        if max_depth is None:
+            max_depth = int(os.getenv("AGENT_MAX_QUEUE_DEPTH", "4"))
+        self.user_id = user_id
+        self.max_depth = max(max_depth, 1)
+        self.depth = 0
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "max_depth_seen": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0
+        }
+    
+    def reserve(self) -> TaskTicket:
+        """Claim a place in the queue, or raise AgentBusyError when it is full"""
+        if self.depth >= self.max_depth:
+            self.stats["rejected"] += 1
+            raise AgentBusyError(self.user_id, self.depth)
+        self.depth += 1
+        self.stats["submitted"] += 1
+        self.stats["max_depth_seen"] = max(self.stats["max_depth_seen"], self.depth)
+        return TaskTicket(self)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "depth": self.depth,
+            "max_depth": self.max_depth
+        }
+    
+    def _record_wait(self, wait: float):
+        self.stats["total_wait"] += wait
+        self.stats["max_wait"] = max(self.stats["max_wait"], wait)
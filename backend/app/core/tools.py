@@ -3,9 +3,10 @@ Project Alfred - Tool System
 Dynamic tool binding and execution
 """
 
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
+from app.services.tracing import tracer
 
 
 @dataclass
@@ -16,6 +17,8 @@ class ToolParameter:
     description: str
     required: bool = True
     default: Optional[Any] = None
+    items: Optional[str] = None  # Element type for "array" parameters
+    enum: Optional[List[Any]] = None  # Allowed values, if restricted
 
 
 @dataclass
@@ -39,6 +42,20 @@ class Tool(ABC):
     async def execute(self, **kwargs) -> Dict[str, Any]:
         """Execute the tool with given parameters"""
         pass
+    
+    def format_output(self, output: Any, parameters: Dict[str, Any]) -> Optional[str]:
+        """
+        Render a successful result for the user without the LLM, or return
+        None if it needs natural-language synthesis (the default)
+        """
+        return None
+
+
+def format_number(value: Any) -> str:
+    """Whole floats without the trailing .0, others without float noise"""
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(round(value, 6))
+    return str(value)
 
 
 class ToolRegistry:
@@ -51,7 +68,7 @@ class ToolRegistry:
         """Register a new tool"""
         metadata = tool.get_metadata()
         self.tools[metadata.name] = tool
-        print(f"[ToolRegistry] Registered tool: {metadata.name}")
+        tracer.event("tool.registered", tool=metadata.name, category=metadata.category)
     
     def get_tool(self, name: str) -> Optional[Tool]:
         """Get a tool by name"""
@@ -67,6 +84,112 @@ class ToolRegistry:
             tool for tool in self.tools.values()
             if tool.get_metadata().category == category
         ]
+    
+    def get_function_schemas(self) -> List[Dict[str, Any]]:
+        """Export every tool as an OpenAI function-calling schema"""
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": metadata.name,
+                    "description": metadata.description,
+                    "parameters": {
+                        "type": "object",
+                        "properties": {p.name: self._parameter_schema(p) for p in metadata.parameters},
+                        "required": [p.name for p in metadata.parameters if p.required]
+                    }
+                }
+            }
+            for metadata in self.list_tools()
+        ]
+    
+    def validate_arguments(self, name: str, arguments: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Check arguments against a tool's parameters before dispatch.
+        Returns the cleaned arguments (unknown names dropped, numeric strings
+        coerced) and a list of validation errors (empty when valid).
+        """
+        tool = self.get_tool(name)
+        if not tool:
+            return {}, [f"Tool not found: {name}"]
+        if not isinstance(arguments, dict):
+            return {}, ["Arguments must be an object"]
+        
+        cleaned = {}
+        errors = []
+        for param in tool.get_metadata().parameters:
+            if param.name not in arguments or arguments[param.name] is None:
+                if param.required:
+                    errors.append(f"Missing required parameter: {param.name}")
+                continue
+            
+            value = _coerce(arguments[param.name], param.type)
+            if value is _INVALID:
+                errors.append(f"Parameter '{param.name}' must be of type {param.type}")
+                continue
+            if param.type == "array" and param.items:
+                value = [_coerce(item, param.items) for item in value]
+                if any(item is _INVALID for item in value):
+                    errors.append(f"Parameter '{param.name}' must contain only {param.items} values")
+                    continue
+            if param.enum and value not in param.enum:
+                errors.append(f"Parameter '{param.name}' must be one of: {', '.join(map(str, param.enum))}")
+                continue
+            cleaned[param.name] = value
+        
+        return cleaned, errors
+    
+    def _parameter_schema(self, param: ToolParameter) -> Dict[str, Any]:
+        schema = {
+            "type": JSON_SCHEMA_TYPES.get(param.type, "string"),
+            "description": param.description
+        }
+        if param.type == "array":
+            schema["items"] = {"type": JSON_SCHEMA_TYPES.get(param.items, "string")} if param.items else {}
+        if param.enum:
+            schema["enum"] = list(param.enum)
+        return schema
+
+
+# ToolParameter.type -> JSON Schema type
+JSON_SCHEMA_TYPES = {
+    "string": "string",
+    "number": "number",
+    "integer": "integer",
+    "boolean": "boolean",
+    "array": "array",
+    "object": "object"
+}
+
+_INVALID = object()
+
+
+def _coerce(value: Any, type_name: str) -> Any:
+    """Convert value to a ToolParameter type, or return _INVALID"""
+    if type_name in ("number", "integer"):
+        if isinstance(value, bool):
+            return _INVALID
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                return _INVALID
+        if not isinstance(value, (int, float)):
+            return _INVALID
+        if type_name == "integer":
+            return int(value) if float(value).is_integer() else _INVALID
+        return value
+    if type_name == "boolean":
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        return value if isinstance(value, bool) else _INVALID
+    if type_name == "array":
+        return value if isinstance(value, list) else _INVALID
+    if type_name == "object":
+        return value if isinstance(value, dict) else _INVALID
+    if type_name == "string":
+        return value if isinstance(value, str) else str(value)
+    return value
 
 
 # Example tool implementations
@@ -93,6 +216,12 @@ class EchoTool(Tool):
             "success": True,
             "output": f"Echo: {message}"
         }
+    
+    def format_output(self, output: Any, parameters: Dict[str, Any]) -> Optional[str]:
+        return str(output)
+
+
+CALCULATOR_SYMBOLS = {"add": "+", "subtract": "-", "multiply": "×", "divide": "÷"}
 
 
 class CalculatorTool(Tool):
@@ -106,7 +235,8 @@ class CalculatorTool(Tool):
                 ToolParameter(
                     name="operation",
                     type="string",
-                    description="The operation to perform: add, subtract, multiply, divide"
+                    description="The operation to perform: add, subtract, multiply, divide",
+                    enum=["add", "subtract", "multiply", "divide"]
                 ),
                 ToolParameter(
                     name="a",
@@ -148,6 +278,12 @@ class CalculatorTool(Tool):
                 "success": False,
                 "error": str(e)
             }
+    
+    def format_output(self, output: Any, parameters: Dict[str, Any]) -> Optional[str]:
+        symbol = CALCULATOR_SYMBOLS.get(parameters.get("operation"))
+        if symbol is None or "a" not in parameters or "b" not in parameters:
+            return format_number(output)
+        return f"{format_number(parameters['a'])} {symbol} {format_number(parameters['b'])} = {format_number(output)}"
 
 
 # Global tool registry instance
@@ -90,10 +90,27 @@ class SupabaseClient:
         
         return message
     
-    async def get_messages(self, conversation_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all messages in a conversation"""
-        convo_messages = self.messages.get(conversation_id, [])
-        return sorted(convo_messages, key=lambda x: x["created_at"])[:limit]
+    async def save_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Save several messages at once (each a dict of save_message's arguments, plus an optional created_at)"""
+        import uuid
+        saved = []
+        for message in messages:
+            row = {
+                "id": str(uuid.uuid4()),
+                "conversation_id": message["conversation_id"],
+                "role": message["role"],
+                "content": message["content"],
+                "metadata": message.get("metadata") or {},
+                "created_at": message.get("created_at") or datetime.utcnow().isoformat()
+            }
+            self.messages.setdefault(row["conversation_id"], []).append(row)
+            saved.append(row)
+        return saved
+    
+    async def get_messages(self, conversation_id: str, limit: int = 100, recent: bool = False) -> List[Dict[str, Any]]:
+        """Get all messages in a conversation (recent=True: the last `limit`, still oldest first)"""
+        convo_messages = sorted(self.messages.get(conversation_id, []), key=lambda x: x["created_at"])
+        return convo_messages[max(len(convo_messages) - limit, 0):] if recent else convo_messages[:limit]
     
     async def save_user_preference(self, user_id: str, key: str, value: Any) -> Dict[str, Any]:
         """Save a user preference"""
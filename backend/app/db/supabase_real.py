@@ -237,8 +237,30 @@ class SupabaseClient:
             print(f"[Supabase] Error saving message: {e}")
             return data
     
-    async def get_messages(self, conversation_id: str, limit: int = 100) -> List[Dict]:
-        """Get conversation messages"""
+    async def save_messages(self, messages: List[Dict]) -> List[Dict]:
+        """Save several messages in one insert (raises on failure so the batch can be retried)"""
+        rows = [
+            {
+                "conversation_id": m["conversation_id"],
+                "role": m["role"],
+                "content": m["content"],
+                "metadata": m.get("metadata") or {},
+                **({"created_at": m["created_at"]} if m.get("created_at") else {})
+            }
+            for m in messages
+        ]
+        if not self.client or not rows:
+            return rows
+        
+        try:
+            result = self.client.table("messages").insert(rows).execute()
+            return result.data or rows
+        except Exception as e:
+            print(f"[Supabase] Error saving messages: {e}")
+            raise
+    
+    async def get_messages(self, conversation_id: str, limit: int = 100, recent: bool = False) -> List[Dict]:
+        """Get conversation messages (recent=True: the last `limit`, still oldest first)"""
         if not self.client:
             return []
         
@@ -246,10 +268,10 @@ class SupabaseClient:
             result = self.client.table("messages")\
                 .select("*")\
                 .eq("conversation_id", conversation_id)\
-                .order("created_at", desc=False)\
+                .order("created_at", desc=recent)\
                 .limit(limit)\
                 .execute()
-            return result.data
+            return list(reversed(result.data)) if recent else result.data
         except Exception as e:
             print(f"[Supabase] Error getting messages: {e}")
             return []
@@ -3,20 +3,36 @@ Project Alfred - Backend API
 Main FastAPI application entry point
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+from datetime import datetime
+import asyncio
+import json
 import uuid
 
-from app.core.agent import CoreAgent
+from app.core.agent_cache import agent_cache
+from app.core.task_queue import AgentBusyError
+from app.core.jobs import JobQueueFullError, job_manager
+from app.core.event_bus import event_bus
 from app.core.tools import tool_registry
+from app.core.fast_path import fast_path_router
+from app.core.speculation import response_speculator
+from app.core.response_composer import response_composer
 from app.core.enhanced_tools import *  # Register enhanced tools
 from app.db.supabase_client import db_client
+from app.services.llm import llm_service
+from app.services.tracing import tracer
+from app.services.concurrency import llm_lane
+from app.services.deadline import Deadline, DeadlineExceededError, bounded, deadline_scope
 from app.api.conversations import router as conversations_router
 from app.api.personalization import router as personalization_router
 from app.api.auth import router as auth_router
 
+T = TypeVar("T")
+
 # Create FastAPI app
 app = FastAPI(
     title="Project Alfred API",
@@ -38,14 +54,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory agent storage (will be replaced with database in later sprints)
-agents = {}
+@app.on_event("startup")
+async def startup():
+    """Load the tokenizer off the event loop so the first request doesn't pay for it"""
+    await asyncio.to_thread(lambda: llm_service.prompt_builder.counter.exact)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background jobs, flush pending side effects and traces, and release the shared LLM connection pool"""
+    await job_manager.shutdown()
+    await event_bus.shutdown()
+    await tracer.flush()
+    await llm_service.aclose()
 
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
     message: str
     user_id: Optional[str] = None
+    use_cache: bool = True  # Set to False to bypass the LLM completion cache
 
 
 class ChatResponse(BaseModel):
@@ -85,43 +113,128 @@ async def health_check():
     }
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def save_messages(events: List[Dict[str, Any]]):
+    """Event bus consumer: write queued chat messages in one batch"""
+    await db_client.save_messages(events)
+
+
+# Messages must not be lost: a full queue makes publishers wait instead of dropping,
+# and a failed write is retried (backing off up to ~15s in total) before it is given up
+event_bus.subscribe("message", "persistence", save_messages, overflow="block", retries=5, retry_backoff=0.5)
+
+
+async def persist_message(conversation_id: str, role: str, content: str, metadata: Optional[Dict[str, Any]] = None):
+    """Queue a chat message for storage (stamped now, so its order survives batching)"""
+    await event_bus.publish("message", {
+        "conversation_id": conversation_id,
+        "role": role,
+        "content": content,
+        "metadata": metadata,
+        "created_at": datetime.utcnow().isoformat()
+    })
+
+
+async def prepare_chat(request: ChatRequest):
     """
-    Main chat endpoint - processes user messages through the cognitive loop
+    Resolve the user, agent and conversation for a chat message, reserve a
+    place in the agent's task queue and persist the user's message.
+    Raises HTTP 429 when the user already has too many tasks pending.
     """
     # Generate or retrieve user_id
     user_id = request.user_id or str(uuid.uuid4())
     
     # Ensure user exists in database
-    user = await db_client.get_user(user_id)
+    user = await bounded(db_client.get_user(user_id), operation="database")
     if not user:
-        await db_client.create_user(user_id)
+        await bounded(db_client.create_user(user_id), operation="database")
     
-    # Create or get agent for this user
-    if user_id not in agents:
-        agents[user_id] = CoreAgent(user_id=user_id)
+    # Get the cached agent for this user, rehydrating it if it was evicted
+    agent = await agent_cache.get(user_id)
     
-    agent = agents[user_id]
+    # Back-pressure before doing any work for this message
+    try:
+        ticket = agent.queue.reserve()
+    except AgentBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     
     try:
         # Get or create conversation
-        conversations = await db_client.get_conversations(user_id, limit=1)
+        conversations = await bounded(db_client.get_conversations(user_id, limit=1), operation="database")
         if conversations:
             conversation_id = conversations[0]["id"]
         else:
-            conversation = await db_client.create_conversation(user_id, "New Chat")
+            conversation = await bounded(db_client.create_conversation(user_id, "New Chat"), operation="database")
             conversation_id = conversation["id"]
         
         # Save user message
-        await db_client.save_message(conversation_id, "user", request.message)
+        await persist_message(conversation_id, "user", request.message)
+    except BaseException:
+        ticket.release()
+        raise
+    
+    return user_id, agent, conversation_id, ticket
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode a Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def request_deadline(http_request: Request) -> Deadline:
+    """The request's time budget: its X-Request-Timeout header (seconds) or the configured default"""
+    return Deadline.for_request(http_request.headers.get("x-request-timeout"))
+
+
+def task_error_status(result: Dict[str, Any]) -> int:
+    """HTTP status for a failed task result"""
+    return 504 if result.get("deadline_exceeded") else 500
+
+
+async def until_disconnected(http_request: Request):
+    """Return once the client has gone away (the body has already been read)"""
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_for_client(http_request: Request, deadline: Deadline, work: Awaitable[T]) -> T:
+    """
+    Run work under the request's deadline, cancelling it as soon as the
+    client disconnects so abandoned requests stop using LLM and tool capacity
+    """
+    with deadline_scope(deadline):
+        task = asyncio.ensure_future(bounded(work, operation="chat"))
+    watcher = asyncio.ensure_future(until_disconnected(http_request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        # Nobody will read this response
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return task.result()
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    """
+    Main chat endpoint - processes user messages through the cognitive loop.
+    The whole request, including its LLM, tool and database calls, must fit
+    in its deadline (504 otherwise) and is abandoned if the client disconnects.
+    """
+    async def handle() -> ChatResponse:
+        user_id, agent, conversation_id, ticket = await prepare_chat(request)
         
-        # Process the task through the cognitive loop
-        result = await agent.process_task(request.message)
+        # Process the task through the cognitive loop (after this user's earlier tasks)
+        result = await agent.process_task(request.message, use_cache=request.use_cache, ticket=ticket)
         
         if result["status"] == "success":
             # Save assistant response
-            await db_client.save_message(
+            await persist_message(
                 conversation_id,
                 "assistant",
                 result["response"],
@@ -135,10 +248,289 @@ async def chat(request: ChatRequest):
                 metadata=result.get("metadata")
             )
         else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Unknown error"))
+            raise HTTPException(status_code=task_error_status(result), detail=result.get("error", "Unknown error"))
+    
+    try:
+        return await run_for_client(http_request, request_deadline(http_request), handle())
+    except HTTPException:
+        raise
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming chat endpoint - emits the cognitive loop as Server-Sent Events
+    (phase, plan, step and token events) followed by a final done event, or
+    an error event if the request's deadline passes first. The response
+    stops (and the loop is cancelled) when the client disconnects.
+    """
+    deadline = request_deadline(http_request)
+    try:
+        with deadline_scope(deadline):
+            user_id, agent, conversation_id, ticket = await prepare_chat(request)
+    except HTTPException:
+        raise
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        events = agent.process_task_stream(request.message, use_cache=request.use_cache, ticket=ticket, deadline=deadline)
+        try:
+            async for event in events:
+                name = event.pop("event")
+                if name == "done":
+                    # Persist the assistant message once the full response is known
+                    await persist_message(
+                        conversation_id,
+                        "assistant",
+                        event["response"],
+                        {"task_id": event["task_id"], "metadata": event["metadata"]}
+                    )
+                    event["user_id"] = user_id
+                yield format_sse(name, event)
+                if deadline.expired and name not in ("done", "error"):
+                    # Stop here rather than keep the client waiting past its budget
+                    yield format_sse("error", {"status": "error", "error": "Request deadline exceeded", "deadline_exceeded": True})
+                    break
+        finally:
+            # Closing the loop's generator cancels whatever it was waiting on
+            await events.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket, user_id: Optional[str] = None):
+    """
+    WebSocket chat session. The client sends {"message": ..., "use_cache":
+    ..., "request_id": ..., "timeout": ...} frames (or {"type": "cancel",
+    "request_id": ...}) at any time; for each message the server pushes
+    "phase", "plan" and "step" events as the cognitive loop runs, then
+    "done" or "error". Every event carries the request_id of the message it
+    belongs to. A message's work is bounded by its timeout (seconds, or the
+    configured default) and cancelled when the socket closes.
+    """
+    await websocket.accept()
+    user_id = user_id or str(uuid.uuid4())
+    outbox: asyncio.Queue = asyncio.Queue()
+    running: Dict[str, asyncio.Task] = {}
     
+    def push(event_type: str, request_id: str, payload: Dict[str, Any]):
+        outbox.put_nowait({"type": event_type, "request_id": request_id, **payload})
+    
+    async def handle(request_id: str, request: ChatRequest):
+        try:
+            _, agent, conversation_id, ticket = await prepare_chat(request)
+        except HTTPException as e:
+            push("error", request_id, {"status_code": e.status_code, "error": e.detail})
+            return
+        except DeadlineExceededError as e:
+            push("error", request_id, {"status_code": 504, "error": str(e)})
+            return
+        except Exception as e:
+            push("error", request_id, {"status_code": 500, "error": str(e)})
+            return
+        
+        def on_event(event: Dict[str, Any]):
+            push(event["event"], request_id, {k: v for k, v in event.items() if k != "event"})
+        
+        try:
+            result = await bounded(
+                agent.process_task(request.message, use_cache=request.use_cache, ticket=ticket, on_event=on_event),
+                operation="chat"
+            )
+            if result["status"] == "success":
+                await persist_message(
+                    conversation_id,
+                    "assistant",
+                    result["response"],
+                    {"task_id": result["task_id"], "metadata": result["metadata"]}
+                )
+                push("done", request_id, {**result, "user_id": user_id})
+            else:
+                push("error", request_id, {"status_code": task_error_status(result), "error": result.get("error", "Unknown error")})
+        except DeadlineExceededError as e:
+            push("error", request_id, {"status_code": 504, "error": str(e)})
+        except Exception as e:
+            push("error", request_id, {"status_code": 500, "error": str(e)})
+    
+    def finished(request_id: str, task: asyncio.Task):
+        running.pop(request_id, None)
+        if task.cancelled():
+            push("cancelled", request_id, {})
+    
+    async def send_events():
+        # Single writer: events from concurrent messages never interleave mid-frame
+        while True:
+            event = await outbox.get()
+            await websocket.send_text(json.dumps(event, default=str))
+    
+    sender = asyncio.create_task(send_events())
+    push("session", "", {"user_id": user_id})
+    try:
+        while True:
+            try:
+                frame = json.loads(await websocket.receive_text())
+                if not isinstance(frame, dict):
+                    raise ValueError("frame must be a JSON object")
+            except ValueError as e:
+                push("error", "", {"status_code": 400, "error": f"Invalid frame: {e}"})
+                continue
+            request_id = str(frame.get("request_id") or uuid.uuid4())
+            if frame.get("type") == "cancel":
+                task = running.get(request_id)
+                if task:
+                    task.cancel()
+                continue
+            if not frame.get("message"):
+                push("error", request_id, {"status_code": 422, "error": "message is required"})
+                continue
+            try:
+                request = ChatRequest(message=frame["message"], user_id=user_id, use_cache=frame.get("use_cache", True))
+            except ValueError as e:
+                # pydantic's ValidationError: reject this message, keep the session
+                push("error", request_id, {"status_code": 422, "error": f"Invalid message: {e}"})
+                continue
+            # Each message gets its own budget ("timeout" seconds, or the default)
+            deadline = Deadline.for_request(frame.get("timeout"))
+            with deadline_scope(deadline):
+                task = asyncio.create_task(handle(request_id, request))
+            task.add_done_callback(lambda t, request_id=request_id: finished(request_id, t))
+            running[request_id] = task
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Nobody is left to receive the results
+        tasks = list(running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        sender.cancel()
+
+
+@app.post("/tasks", status_code=202)
+async def submit_task(request: ChatRequest):
+    """
+    Background chat endpoint - queues the message for the cognitive loop and
+    returns a job to poll at /tasks/{job_id} instead of holding the connection
+    """
+    try:
+        user_id, agent, conversation_id, ticket = await prepare_chat(request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    async def run() -> Dict[str, Any]:
+        # Queued work yields the LLM to interactive requests
+        with llm_lane("background"):
+            result = await agent.process_task(request.message, use_cache=request.use_cache, ticket=ticket)
+        if result["status"] == "success":
+            await persist_message(
+                conversation_id,
+                "assistant",
+                result["response"],
+                {"task_id": result["task_id"], "metadata": result["metadata"]}
+            )
+        return result
+    
+    try:
+        job = job_manager.submit(user_id, run, on_discard=ticket.release)
+    except JobQueueFullError as e:
+        ticket.release()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return job.to_dict()
+
+
+@app.get("/tasks/{job_id}")
+async def get_task(job_id: str):
+    """Poll a background job's status and, once finished, its result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.post("/tasks/{job_id}/cancel")
+async def cancel_task(job_id: str):
+    """Cancel a queued or running background job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Give a running job a moment to unwind so the reply shows its final status
+    try:
+        await asyncio.wait_for(job.done.wait(), timeout=1.0)
+    except asyncio.TimeoutError:
+        pass
+    return job.to_dict()
+
+
+def agent_queue_stats() -> Dict[str, Any]:
+    """Aggregate the per-user task queues"""
+    queues = [agent.queue.get_stats() for agent in agent_cache.values()]
+    submitted = sum(q["submitted"] for q in queues)
+    return {
+        "agents": len(queues),
+        "busy": sum(1 for q in queues if q["depth"]),
+        "pending": sum(q["depth"] for q in queues),
+        "submitted": submitted,
+        "rejected": sum(q["rejected"] for q in queues),
+        "avg_wait": sum(q["total_wait"] for q in queues) / submitted if submitted else 0.0,
+        "max_wait": max((q["max_wait"] for q in queues), default=0.0)
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime performance counters"""
+    return {
+        "llm_cache": llm_service.cache.get_stats(),
+        "llm_coalescing": llm_service.single_flight.get_stats(),
+        "llm_prompts": llm_service.prompt_builder.get_stats(),
+        "llm_routing": llm_service.models.get_stats(),
+        "llm_calls": llm_service.metrics.get_stats(),
+        "llm_concurrency": llm_service.limiter.get_stats(),
+        "llm_hedging": llm_service.hedging.get_stats(),
+        "fast_path": fast_path_router.get_stats(),
+        "speculation": response_speculator.get_stats(),
+        "response_composition": response_composer.get_stats(),
+        "agent_queues": agent_queue_stats(),
+        "agent_cache": agent_cache.get_stats(),
+        "jobs": job_manager.get_stats(),
+        "event_bus": event_bus.get_stats(),
+        "tracing": tracer.get_stats()
+    }
+
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """LLM call latency histograms (with buckets), token usage and retries per method, model and outcome"""
+    return {"series": llm_service.metrics.get_stats(buckets=True)}
+
+
+@app.get("/traces")
+async def list_traces(limit: int = 20):
+    """Most recent traces still held in the span buffer"""
+    return {"traces": tracer.recent_traces(limit), "events": list(tracer.events)[-limit:]}
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Every buffered span of one trace (a chat response's metadata.trace_id)"""
+    spans = tracer.get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
 
 
 @app.get("/tools")
@@ -169,14 +561,15 @@ async def list_tools():
 @app.get("/conversation/{user_id}")
 async def get_conversation(user_id: str):
     """Get conversation history for a user"""
-    if user_id not in agents:
+    agent = await agent_cache.get(user_id, create=False)
+    if agent is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    agent = agents[user_id]
     return {
         "user_id": user_id,
-        "conversation_history": agent.world_model.conversation_history,
-        "message_count": len(agent.world_model.conversation_history)
+        "conversation_history": list(agent.world_model.conversation_history),
+        "message_count": len(agent.world_model.conversation_history),
+        "summary": agent.world_model.conversation_history.summary.to_dict()
     }
 
 
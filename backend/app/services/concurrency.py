@@ -0,0 +1,183 @@
+"""
+Project Alfred - Adaptive Concurrency Limiter
+AIMD admission control with priority lanes in front of the LLM provider
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import contextlib
+import contextvars
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.services.llm_metrics import Histogram
+
+
+# Lower value = served first
+LANES = {
+    "interactive": 0,
+    "normal": 1,
+    "background": 2
+}
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+_lane_override: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_lane_override", default=None)
+
+
+@contextlib.contextmanager
+def llm_lane(lane: str) -> Iterator[None]:
+    """Run the LLM calls made inside this block in the given lane"""
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane: {lane}")
+    token = _lane_override.set(lane)
+    try:
+        yield
+    finally:
+        _lane_override.reset(token)
+
+
+class Slot:
+    """An admitted request; release() exactly once when the upstream call is finished"""
+    
+    def __init__(self, limiter: "AdaptiveLimiter"):
+        self.limiter = limiter
+        self.released = False
+    
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter._release()
+
+
+class AdaptiveLimiter:
+    """
+    Bounds concurrent upstream calls with a limit that adapts AIMD-style:
+    it grows by about one per round trip while latency stays near its
+    per-method baseline, and is cut multiplicatively on rate limits,
+    timeouts and latency blow-ups. Waiters are admitted by lane, then FIFO.
+    """
+    
+    def __init__(
+        self,
+        initial_limit: Optional[int] = None,
+        min_limit: Optional[int] = None,
+        max_limit: Optional[int] = None
+    ):
+        self.min_limit = min_limit or int(os.getenv("LLM_CONCURRENCY_MIN", "2"))
+        self.max_limit = max_limit or int(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+        self.limit = float(initial_limit or int(os.getenv("LLM_CONCURRENCY_INITIAL", "16")))
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        self.enabled = os.getenv("LLM_CONCURRENCY_ENABLED", "true").lower() == "true"
+        
+        # A call slower than tolerance x its method's baseline signals congestion
+        self.latency_tolerance = float(os.getenv("LLM_CONCURRENCY_LATENCY_TOLERANCE", "2.0"))
+        self.backoff = 0.5
+        self.latency_backoff = 0.9
+        self.cooldown = 1.0
+        self.baselines: Dict[str, float] = {}
+        self._last_decrease = 0.0
+        
+        self.inflight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.queued = {lane: 0 for lane in LANES}
+        self.wait_times = {lane: Histogram(WAIT_BUCKETS) for lane in LANES}
+        self.stats = {
+            "admitted": 0,
+            "max_queued": 0,
+            "increases": 0,
+            "decreases": 0,
+            "rate_limited": 0,
+            "timeouts": 0
+        }
+    
+    def lane_for(self, method: str) -> str:
+        """The lane a call runs in: an llm_lane() override, else interactive for response generation"""
+        override = _lane_override.get()
+        if override:
+            return override
+        return "interactive" if method == "generate_response" else "normal"
+    
+    async def acquire(self, lane: str) -> Slot:
+        """Wait for capacity in priority order and return a Slot"""
+        started = time.perf_counter()
+        if not self.enabled or (self.inflight < int(self.limit) and not self._waiters):
+            self.inflight += 1
+            return self._admit(lane, started)
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LANES[lane], next(self._seq), future))
+        self.queued[lane] += 1
+        self.stats["max_queued"] = max(self.stats["max_queued"], sum(self.queued.values()))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: hand the capacity on
+                self._release()
+            raise
+        finally:
+            self.queued[lane] -= 1
+        return self._admit(lane, started)
+    
+    def on_success(self, method: str, latency: float):
+        """Feed back a completed call's latency (time to response headers for streams)"""
+        baseline = self.baselines.get(method)
+        self.baselines[method] = latency if baseline is None else baseline * 0.9 + latency * 0.1
+        
+        if baseline is not None and latency > baseline * self.latency_tolerance:
+            self._decrease(self.latency_backoff)
+        elif self.inflight + 1 >= self.limit and self.limit < self.max_limit:
+            # Only grow when the limit is actually what holds us back
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+            self.stats["increases"] += 1
+            self._dispatch()
+    
+    def on_rate_limited(self):
+        self.stats["rate_limited"] += 1
+        self._decrease(self.backoff)
+    
+    def on_timeout(self):
+        self.stats["timeouts"] += 1
+        self._decrease(self.backoff)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limit, in-flight and queued counts, and per-lane wait-time histograms"""
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "queued": dict(self.queued),
+            "queue_depth": sum(self.queued.values()),
+            "wait_time": {lane: histogram.to_dict() for lane, histogram in self.wait_times.items()}
+        }
+    
+    def _admit(self, lane: str, started: float) -> Slot:
+        self.stats["admitted"] += 1
+        self.wait_times[lane].observe(time.perf_counter() - started)
+        return Slot(self)
+    
+    def _release(self):
+        self.inflight -= 1
+        self._dispatch()
+    
+    def _decrease(self, factor: float):
+        # One cut per cooldown window so a burst of errors doesn't collapse the limit
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * factor, self.min_limit)
+        self.stats["decreases"] += 1
+    
+    def _dispatch(self):
+        """Admit waiters in lane order while there is capacity"""
+        while self._waiters and (not self.enabled or self.inflight < int(self.limit)):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.inflight += 1
+            future.set_result(None)
@@ -0,0 +1,131 @@
+"""
+Project Alfred - Request Deadlines
+A per-request time budget carried in a context variable so every LLM, tool and database hop can trim its own timeout to what is left
+"""
+
+import os
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar, Union
+
+
+T = TypeVar("T")
+
+# Optional work only starts while at least this many seconds of the request remain
+OPTIONAL_RESERVE = float(os.getenv("DEADLINE_OPTIONAL_RESERVE", "5"))
+
+# The deadline of the request this context is working on, if it has one
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    """Raised when a hop starts (or would wait) after its request's deadline"""
+    
+    def __init__(self, operation: str = "request"):
+        super().__init__(f"Deadline exceeded before {operation} could finish")
+        self.operation = operation
+
+
+class Deadline:
+    """
+    An absolute point in time (on the monotonic clock) by which a request
+    must be answered. Hops ask it for their timeout instead of using a
+    fixed one, and optional work checks has_time_for() before starting.
+    """
+    
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+    
+    @classmethod
+    def for_request(cls, requested: Optional[Union[str, float]] = None) -> "Deadline":
+        """
+        The deadline for a request: the budget in seconds the client asked
+        for (e.g. its X-Request-Timeout header) if usable, never longer than
+        REQUEST_DEADLINE_MAX, else the REQUEST_DEADLINE default
+        """
+        default = float(os.getenv("REQUEST_DEADLINE", "25"))
+        ceiling = float(os.getenv("REQUEST_DEADLINE_MAX", "60"))
+        try:
+            budget = float(requested) if requested else default
+        except (TypeError, ValueError):
+            budget = default
+        if budget <= 0:
+            budget = default
+        return cls(min(budget, ceiling))
+    
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+    
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+    
+    def timeout(self, cap: Optional[float] = None, operation: str = "request") -> float:
+        """The time left, no more than cap; raises DeadlineExceededError if none is left"""
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(operation)
+        return remaining if cap is None else min(cap, remaining)
+    
+    def has_time_for(self, seconds: float) -> bool:
+        return self.expires_at - time.monotonic() >= seconds
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make deadline the current one for the work done inside the block"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            _current_deadline.reset(token)
+        except ValueError:
+            # Async generators may be closed from a different context
+            pass
+
+
+def remaining_timeout(cap: float, operation: str = "request") -> float:
+    """cap trimmed to the current request's remaining time (cap itself outside a request)"""
+    deadline = _current_deadline.get()
+    return cap if deadline is None else deadline.timeout(cap, operation)
+
+
+def has_time_for(seconds: Optional[float] = None) -> bool:
+    """
+    Whether optional work (personalization, suggestions, ...) still fits in
+    the current request, leaving OPTIONAL_RESERVE seconds (or the given
+    amount) for the rest of it. Always true outside a request.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return True
+    return deadline.has_time_for(OPTIONAL_RESERVE if seconds is None else seconds)
+
+
+async def bounded(awaitable: Awaitable[T], cap: Optional[float] = None, operation: str = "request") -> T:
+    """Await with a timeout of cap trimmed to the current request's remaining time"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        if cap is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, cap)
+    try:
+        timeout = deadline.timeout(cap, operation)
+    except DeadlineExceededError:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError as e:
+        if deadline.expired:
+            raise DeadlineExceededError(operation) from e
+        raise
@@ -0,0 +1,85 @@
+"""
+Project Alfred - Hedged Requests
+Latency-percentile triggers and an extra-call budget for duplicate LLM requests
+"""
+
+import os
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class HedgePolicy:
+    """
+    Tracks recent upstream latencies per method and decides when a slow
+    call deserves a duplicate: once it has run longer than the method's
+    observed percentile, and only while hedges stay within the budget
+    (a fraction of all hedgeable calls)
+    """
+    
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        budget: Optional[float] = None,
+        percentile: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window: int = 500
+    ):
+        if enabled is None:
+            enabled = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.budget = budget if budget is not None else float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))
+        self.percentile = percentile if percentile is not None else float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+        self.min_samples = min_samples if min_samples is not None else int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.window = window
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.stats = {
+            "requests": 0,
+            "fired": 0,
+            "won": 0,
+            "budget_denied": 0
+        }
+    
+    def observe(self, method: str, latency: float):
+        """Record the latency of one completed upstream attempt"""
+        self.latencies.setdefault(method, deque(maxlen=self.window)).append(latency)
+    
+    def delay_for(self, method: str) -> Optional[float]:
+        """Seconds to wait before hedging a new call, or None if it should not be hedged"""
+        if not self.enabled:
+            return None
+        samples = self.latencies.get(method)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        self.stats["requests"] += 1
+        return self._quantile(samples)
+    
+    def try_fire(self) -> bool:
+        """Claim budget for one hedge"""
+        if self.stats["fired"] + 1 > self.budget * self.stats["requests"]:
+            self.stats["budget_denied"] += 1
+            return False
+        self.stats["fired"] += 1
+        return True
+    
+    def record_win(self):
+        self.stats["won"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedge counters and the current trigger delay per method"""
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "budget": self.budget,
+            "hedge_rate": self.stats["fired"] / requests if requests else 0.0,
+            "win_rate": self.stats["won"] / self.stats["fired"] if self.stats["fired"] else 0.0,
+            "triggers": {
+                method: self._quantile(samples)
+                for method, samples in self.latencies.items()
+                if len(samples) >= self.min_samples
+            }
+        }
+    
+    def _quantile(self, samples: Deque[float]) -> float:
+        ordered = sorted(samples)
+        return ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
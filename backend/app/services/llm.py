@@ -5,25 +5,297 @@ OpenAI integration for intelligent analysis and planning
 
 import os
 import json
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import time
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional
+import httpx
+from openai import APITimeoutError, AsyncOpenAI
+from openai.types.chat import ChatCompletion
+from app.services.llm_cache import CompletionCache, DEFAULT_CACHE_TTLS
+from app.services.single_flight import SingleFlight
+from app.services.prompt_builder import PromptBuilder
+from app.services.model_router import ModelRouter
+from app.services.llm_metrics import LLMMetrics
+from app.services.concurrency import AdaptiveLimiter
+from app.services.hedging import HedgePolicy
+from app.services.tracing import tracer
+from app.services.deadline import bounded, current_deadline, deadline_scope, remaining_timeout
+
+
+# Per-method request timeouts in seconds (LLM_TIMEOUT caps all of them, and
+# a request's deadline trims them to the time it has left)
+DEFAULT_TIMEOUTS = {
+    "analyze_intent": 15.0,
+    "create_plan": 20.0,
+    "plan_with_tools": 20.0,
+    "analyze_and_plan": 25.0,
+    "generate_response": 30.0,
+    "extract_tool_parameters": 10.0,
+    "extract_batch_parameters": 15.0
+}
 
 
 class LLMService:
     """Service for interacting with OpenAI's LLM"""
     
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         base_url = os.getenv("OPENAI_API_BASE")
         
+        # LLM_BACKEND=stub serves completions from the in-process offline stub
+        self.stub_backend = None
+        if transport is None and os.getenv("LLM_BACKEND", "openai") == "stub":
+            from app.services.llm_stub import StubLLMBackend
+            self.stub_backend = StubLLMBackend.from_env()
+            transport = self.stub_backend.transport()
+            api_key = api_key or "stub-key"
+        
+        # One keep-alive pool shared by every request on this worker
+        max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", str(max_connections))),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        )
+        timeout_cap = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.timeouts = {method: min(t, timeout_cap) for method, t in DEFAULT_TIMEOUTS.items()}
+        
+        # Per-method/model/outcome latency, token and retry metrics
+        self.metrics = LLMMetrics()
+        
+        # Adaptive bound on concurrent upstream calls, interactive calls first
+        self.limiter = AdaptiveLimiter()
+        
+        # Duplicate calls that outlive the method's p95 (off unless LLM_HEDGING_ENABLED)
+        self.hedging = HedgePolicy()
+        
+        self.http_client = httpx.AsyncClient(
+            limits=self.limits,
+            timeout=httpx.Timeout(timeout_cap, connect=5.0),
+            transport=transport,
+            event_hooks={"request": [self._count_attempt], "response": [self._check_rate_limit]}
+        )
+        
         if base_url:
-            self.client = OpenAI(api_key=api_key, base_url=base_url)
+            self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self.http_client)
         else:
-            self.client = OpenAI(api_key=api_key)
+            self.client = AsyncOpenAI(api_key=api_key, http_client=self.http_client)
+        
+        # Cheap, fast models on the classification hops; GPT-4o where quality matters
+        self.models = ModelRouter()
+        self.model = self.models.strong_model
         
-        self.model = "gpt-4o"  # Using GPT-4 for best results
+        # Completion cache for the low-temperature, highly repetitive calls
+        self.cache_enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.cache_ttls = dict(DEFAULT_CACHE_TTLS)
+        self.cache = CompletionCache(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            disk_dir=os.getenv("LLM_CACHE_DIR")
+        )
+        
+        # Token-budgeted prompt assembly
+        self.prompt_builder = PromptBuilder(self.model)
+        
+        # Identical concurrent requests share one upstream call
+        self.coalesce_enabled = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+        self.single_flight = SingleFlight()
     
-    async def analyze_intent(self, user_input: str, context: str) -> Dict[str, Any]:
+    async def _complete(
+        self,
+        method: str,
+        use_cache: bool = True,
+        model: Optional[str] = None,
+        cacheable: Optional[Callable[[ChatCompletion], bool]] = None,
+        **kwargs
+    ):
+        """
+        Send a chat completion through the shared async client, serving
+        repeats from the cache and coalescing identical in-flight requests.
+        If given, cacheable decides whether a fresh response may be cached
+        (so unusable output is not replayed for the whole TTL).
+        """
+        request = {"model": model or self.model, **kwargs}
+        call = self.metrics.current_call()
+        if call:
+            call.model = request["model"]
+        
+        if kwargs.get("stream"):
+            return await self._send(method, request)
+        
+        ttl = self.cache_ttls.get(method, 0) if self.cache_enabled else 0
+        if ttl > 0 and not use_cache:
+            self.cache.note_bypass()
+            ttl = 0
+        
+        key = self.cache.make_key(request)
+        if ttl > 0:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                if call:
+                    call.cached = True
+                return ChatCompletion.model_validate(cached)
+        
+        async def fetch():
+            response = await self._send_hedged(method, request)
+            if ttl > 0 and (cacheable is None or cacheable(response)):
+                await self.cache.set(key, response.model_dump(), ttl)
+            return response
+        
+        if not self.coalesce_enabled:
+            return await fetch()
+        
+        async def shared_fetch():
+            # Shared by callers with different deadlines: each one waits only as long
+            # as its own allows, and the call is cancelled once all of them have left
+            with deadline_scope(None):
+                return await fetch()
+        
+        return await bounded(self.single_flight.do(f"{method}:{key}", shared_fetch), operation=f"llm.{method}")
+    
+    async def _send(self, method: str, request: Dict[str, Any]):
+        """Issue the completion request upstream once the limiter admits it"""
+        lane = self.limiter.lane_for(method)
+        with tracer.span("llm.request", method=method, model=request["model"], lane=lane, stream=bool(request.get("stream"))) as span:
+            queued_at = time.perf_counter()
+            slot = await bounded(self.limiter.acquire(lane), operation=f"llm.{method}")
+            try:
+                start = time.perf_counter()
+                span.set(queued=start - queued_at)
+                # Each attempt gets at most the time left, and so do the SDK's retries together
+                timeout = remaining_timeout(self.timeouts[method], f"llm.{method}")
+                span.set(timeout=timeout)
+                response = await bounded(
+                    self.client.chat.completions.create(timeout=timeout, **request),
+                    operation=f"llm.{method}"
+                )
+                latency = time.perf_counter() - start
+            except APITimeoutError:
+                # Running out of request budget says nothing about upstream health
+                deadline = current_deadline()
+                if deadline is None or not deadline.expired:
+                    self.limiter.on_timeout()
+                slot.release()
+                raise
+            except BaseException:
+                slot.release()
+                raise
+        
+        self.limiter.on_success(method, latency)
+        if not request.get("stream"):
+            self.hedging.observe(method, latency)
+        usage = None if request.get("stream") else response.usage
+        self.models.record(method, request["model"], latency, usage)
+        call = self.metrics.current_call()
+        if call:
+            call.add_usage(usage)
+        
+        if request.get("stream"):
+            # The connection stays busy until the stream is drained
+            return self._release_after(response, slot)
+        slot.release()
+        return response
+    
+    async def _send_hedged(self, method: str, request: Dict[str, Any]):
+        """
+        Send the request; if it outlives the method's observed p95, race a
+        duplicate against it and keep whichever succeeds first
+        """
+        delay = self.hedging.delay_for(method)
+        if delay is None:
+            return await self._send(method, request)
+        
+        primary = asyncio.ensure_future(self._send(method, request))
+        attempts = [primary]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and self.hedging.try_fire():
+                attempts.append(asyncio.ensure_future(self._send(method, request)))
+            
+            # First success wins; an error only surfaces once every attempt has failed
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in attempts:
+                    if task in done and task.exception() is None:
+                        if task is not primary:
+                            self.hedging.record_win()
+                        return task.result()
+            return primary.result()
+        finally:
+            # Cancel the loser (or everything, if our caller went away)
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+    
+    async def _release_after(self, stream, slot) -> AsyncIterator[Any]:
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            slot.release()
+            await stream.close()
+    
+    async def _count_attempt(self, request: httpx.Request):
+        """httpx hook: every upstream attempt, including SDK retries, counts toward the current call"""
+        call = self.metrics.current_call()
+        if call:
+            call.attempts += 1
+    
+    async def _check_rate_limit(self, response: httpx.Response):
+        """httpx hook: 429s (even ones the SDK retries) shrink the concurrency limit"""
+        if response.status_code == 429:
+            self.limiter.on_rate_limited()
+    
+    async def _complete_json(
+        self,
+        method: str,
+        complexity: Optional[str] = None,
+        validate: Optional[Callable[[Any], None]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Request a JSON completion on the routed model. If the output does not
+        parse (or fails validate), retry once on the stronger fallback model.
+        """
+        model = self.models.select(method, complexity)
+        
+        def cacheable(response) -> bool:
+            # Only output that will actually be used is worth replaying
+            try:
+                self._parse_json(response, validate)
+            except ValueError:
+                return False
+            return True
+        
+        response = await self._complete(method, model=model, cacheable=cacheable, **kwargs)
+        try:
+            return self._parse_json(response, validate)
+        except ValueError as e:
+            fallback = self.models.fallback_for(model)
+            if fallback is None:
+                raise
+            tracer.event("llm.model_fallback", method=method, model=model, fallback=fallback, error=str(e))
+            self.models.record_fallback(method, model)
+            response = await self._complete(method, model=fallback, cacheable=cacheable, **kwargs)
+            return self._parse_json(response, validate)
+    
+    def _parse_json(self, response, validate: Optional[Callable[[Any], None]] = None) -> Any:
+        """Decode a JSON completion; ValueError means the model's output was unusable"""
+        result = json.loads(response.choices[0].message.content or "")
+        if validate:
+            validate(result)
+        return result
+    
+    def _messages(self, method: str, system_prompt: str, template: str, **sections) -> List[Dict[str, str]]:
+        """Assemble the chat messages with every section held to its token budget"""
+        messages, _ = self.prompt_builder.build(method, system_prompt, template, sections)
+        return messages
+    
+    async def aclose(self):
+        """Close the shared connection pool"""
+        await self.http_client.aclose()
+    
+    async def analyze_intent(self, user_input: str, context: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Analyze user intent and extract key information
         """
@@ -37,131 +309,351 @@ Return a JSON object with:
 - complexity: "simple", "medium", or "complex"
 - summary: Brief summary of the request"""
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Context: {context}\n\nUser request: {user_input}"}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
-            
-            analysis = json.loads(response.choices[0].message.content)
-            return analysis
-            
-        except Exception as e:
-            print(f"[LLM] Error in analyze_intent: {e}")
-            # Fallback to simple analysis
-            return {
-                "intent": "respond_to_query",
-                "entities": [],
-                "requires_tools": False,
-                "complexity": "simple",
-                "summary": user_input[:100]
-            }
-    
-    async def create_plan(self, user_input: str, analysis: Dict[str, Any], available_tools: List[str]) -> List[Dict[str, Any]]:
+        with self.metrics.track("analyze_intent") as call:
+            try:
+                return await self._complete_json(
+                    "analyze_intent",
+                    use_cache=use_cache,
+                    messages=self._messages(
+                        "analyze_intent",
+                        system_prompt,
+                        "Context: {context}\n\nUser request: {user_input}",
+                        context=context,
+                        user_input=user_input
+                    ),
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+                
+            except Exception as e:
+                call.fail(e)
+                # Fallback to simple analysis
+                return {
+                    "intent": "respond_to_query",
+                    "entities": [],
+                    "requires_tools": False,
+                    "complexity": "simple",
+                    "summary": user_input[:100]
+                }
+    
+    async def create_plan(self, user_input: str, analysis: Dict[str, Any], available_tools: List[str], use_cache: bool = True) -> List[Dict[str, Any]]:
         """
         Create a step-by-step execution plan
         """
         system_prompt = f"""You are an AI assistant that creates execution plans.
 Given a user request and analysis, create a step-by-step plan.
 
-Available tools: {', '.join(available_tools)}
+Available tools: {self.prompt_builder.fit('tool_params', ', '.join(available_tools))}
 
 Return a JSON array of steps, where each step has:
 - step: Step number
 - action: The action to perform
 - tool: Tool to use (or null if no tool needed)
 - description: What this step accomplishes
-- parameters: Parameters for the tool (if applicable)
+- parameters: Parameters for the tool (if applicable); "{{s1}}" stands for the output of step 1
+- depends_on: Step numbers whose results this step needs (omit for independent steps, which run in parallel)
 
 Keep plans concise and efficient."""
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User request: {user_input}\n\nAnalysis: {json.dumps(analysis)}"}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            plan = result.get("steps", result.get("plan", []))
-            
-            # Ensure plan is a list
-            if not isinstance(plan, list):
-                plan = [plan]
-            
-            return plan
-            
-        except Exception as e:
-            print(f"[LLM] Error in create_plan: {e}")
-            # Fallback to simple plan
-            return [{
-                "step": 1,
-                "action": "generate_response",
-                "tool": None,
-                "description": "Generate a response to the user"
-            }]
-    
-    async def generate_response(self, user_input: str, context: str, execution_results: Dict[str, Any]) -> str:
+        with self.metrics.track("create_plan") as call:
+            try:
+                result = await self._complete_json(
+                    "create_plan",
+                    complexity=analysis.get("complexity"),
+                    use_cache=use_cache,
+                    messages=self._messages(
+                        "create_plan",
+                        system_prompt,
+                        "User request: {user_input}\n\nAnalysis: {analysis}",
+                        user_input=user_input,
+                        analysis=analysis
+                    ),
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+                
+                return self._parse_plan(result)
+                
+            except Exception as e:
+                call.fail(e)
+                # Fallback to simple plan
+                return [{
+                    "step": 1,
+                    "action": "generate_response",
+                    "tool": None,
+                    "description": "Generate a response to the user"
+                }]
+    
+    async def plan_with_tools(self, user_input: str, analysis: Dict[str, Any], tool_schemas: List[Dict[str, Any]], use_cache: bool = True) -> Optional[List[Dict[str, Any]]]:
         """
-        Generate a natural language response based on execution results
+        Plan through native function calling: the model answers with tool
+        calls whose typed arguments become use_tool steps, followed by a
+        generate_response step. Returns None if the call fails, so the
+        caller can fall back to create_plan.
         """
+        system_prompt = """You are an AI assistant that creates execution plans.
+Call the tools needed to fulfil the user's request, in the order they should run, with complete arguments.
+If no tool is needed, answer without calling any tool."""
+
+        with self.metrics.track("plan_with_tools") as call:
+            try:
+                response = await self._complete(
+                    "plan_with_tools",
+                    model=self.models.select("plan_with_tools", analysis.get("complexity")),
+                    use_cache=use_cache,
+                    messages=self._messages(
+                        "plan_with_tools",
+                        system_prompt,
+                        "User request: {user_input}\n\nAnalysis: {analysis}",
+                        user_input=user_input,
+                        analysis=analysis
+                    ),
+                    tools=tool_schemas,
+                    tool_choice="auto",
+                    temperature=0.3
+                )
+                
+                return self._parse_tool_calls(response.choices[0].message.tool_calls or [])
+                
+            except Exception as e:
+                call.fail(e)
+                return None
+    
+    def _parse_tool_calls(self, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        """Turn provider tool calls into use_tool steps plus a closing generate_response step"""
+        plan = []
+        for tool_call in tool_calls:
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except ValueError:
+                # Left empty so parameter extraction fills them in
+                arguments = {}
+            plan.append({
+                "step": len(plan) + 1,
+                "action": "use_tool",
+                "tool": tool_call.function.name,
+                "description": f"Call {tool_call.function.name}",
+                "parameters": arguments if isinstance(arguments, dict) else {}
+            })
+        plan.append({
+            "step": len(plan) + 1,
+            "action": "generate_response",
+            "tool": None,
+            "description": "Respond to the user"
+        })
+        return plan
+    
+    async def analyze_and_plan(self, user_input: str, context: str, available_tools: List[str], use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Analyze intent and create the execution plan in a single round trip.
+        Returns {"analysis": ..., "plan": [...]} or None if the fused call
+        fails, so the caller can fall back to analyze_intent + create_plan.
+        """
+        system_prompt = f"""You are an AI assistant that analyzes user requests and plans how to fulfil them.
+
+Available tools: {self.prompt_builder.fit('tool_params', ', '.join(available_tools))}
+
+Return a JSON object with two keys:
+- analysis: an object with
+  - intent: The primary intent (e.g., "answer_question", "perform_calculation", "create_content")
+  - entities: List of important entities mentioned
+  - requires_tools: Boolean indicating if external tools are needed
+  - complexity: "simple", "medium", or "complex"
+  - summary: Brief summary of the request
+- steps: an array of steps, where each step has:
+  - step: Step number
+  - action: The action to perform ("use_tool" or "generate_response")
+  - tool: Tool to use (or null if no tool needed)
+  - description: What this step accomplishes
+  - parameters: Parameters for the tool (if applicable); "{{s1}}" stands for the output of step 1
+  - depends_on: Step numbers whose results this step needs (omit for independent steps, which run in parallel)
+
+Keep plans concise and efficient."""
+
+        with self.metrics.track("analyze_and_plan") as call:
+            try:
+                result = await self._complete_json(
+                    "analyze_and_plan",
+                    validate=self._validate_fused,
+                    use_cache=use_cache,
+                    messages=self._messages(
+                        "analyze_and_plan",
+                        system_prompt,
+                        "Context: {context}\n\nUser request: {user_input}",
+                        context=context,
+                        user_input=user_input
+                    ),
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+                
+                return {
+                    "analysis": result["analysis"],
+                    "plan": self._parse_plan(result)
+                }
+                
+            except Exception as e:
+                call.fail(e)
+                return None
+    
+    def _validate_fused(self, result: Any):
+        """analyze_and_plan output must carry an analysis object"""
+        if not isinstance(result, dict) or not isinstance(result.get("analysis"), dict):
+            raise ValueError("Missing analysis object")
+    
+    def _parse_plan(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pull the step list out of a planning response"""
+        plan = result.get("steps", result.get("plan", []))
+        
+        # Ensure plan is a list
+        if not isinstance(plan, list):
+            plan = [plan]
+        
+        return plan
+    
+    def _response_messages(self, user_input: str, context: str, execution_results: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build the prompt shared by generate_response and stream_response"""
         system_prompt = """You are Alfred, an intelligent AI assistant.
 You help users by understanding their requests, planning actions, and providing helpful responses.
 
 Generate a natural, conversational response based on the execution results.
 Be helpful, concise, and friendly."""
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User request: {user_input}\n\nContext: {context}\n\nExecution results: {json.dumps(execution_results)}\n\nGenerate a helpful response:"}
-                ],
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            print(f"[LLM] Error in generate_response: {e}")
-            return f"I processed your request: '{user_input}'. I'm Alfred, and I'm here to help!"
+        return self._messages(
+            "generate_response",
+            system_prompt,
+            "User request: {user_input}\n\nContext: {context}\n\nExecution results: {execution_results}\n\nGenerate a helpful response:",
+            user_input=user_input,
+            context=context,
+            execution_results=execution_results
+        )
+    
+    def _fallback_response(self, user_input: str) -> str:
+        return f"I processed your request: '{user_input}'. I'm Alfred, and I'm here to help!"
+    
+    async def generate_response(self, user_input: str, context: str, execution_results: Dict[str, Any], complexity: Optional[str] = None) -> str:
+        """
+        Generate a natural language response based on execution results
+        """
+        with self.metrics.track("generate_response") as call:
+            try:
+                response = await self._complete(
+                    "generate_response",
+                    model=self.models.select("generate_response", complexity),
+                    messages=self._response_messages(user_input, context, execution_results),
+                    temperature=0.7
+                )
+                
+                return response.choices[0].message.content
+                
+            except Exception as e:
+                call.fail(e)
+                return self._fallback_response(user_input)
+    
+    async def stream_response(self, user_input: str, context: str, execution_results: Dict[str, Any], complexity: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream the natural language response token by token
+        """
+        streamed = False
+        with self.metrics.track("stream_response") as call:
+            try:
+                stream = await self._complete(
+                    "generate_response",
+                    model=self.models.select("generate_response", complexity),
+                    messages=self._response_messages(user_input, context, execution_results),
+                    temperature=0.7,
+                    stream=True
+                )
+                
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        streamed = True
+                        yield chunk.choices[0].delta.content
+                
+            except Exception as e:
+                call.fail(e)
+                # Only fall back if the client has not already seen partial output
+                if not streamed:
+                    yield self._fallback_response(user_input)
     
-    async def extract_tool_parameters(self, user_input: str, tool_name: str, tool_params: List[Dict]) -> Dict[str, Any]:
+    async def extract_tool_parameters(self, user_input: str, tool_name: str, tool_params: List[Dict], use_cache: bool = True, complexity: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract parameters for a specific tool from user input
         """
         system_prompt = f"""Extract parameters for the '{tool_name}' tool from the user's request.
 
-Tool parameters: {json.dumps(tool_params)}
+Tool parameters: {self.prompt_builder.fit('tool_params', tool_params)}
 
 Return a JSON object with the extracted parameter values."""
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            return json.loads(response.choices[0].message.content)
-            
-        except Exception as e:
-            print(f"[LLM] Error in extract_tool_parameters: {e}")
-            return {}
+        with self.metrics.track("extract_tool_parameters") as call:
+            try:
+                return await self._complete_json(
+                    "extract_tool_parameters",
+                    complexity=complexity,
+                    use_cache=use_cache,
+                    messages=self._messages(
+                        "extract_tool_parameters",
+                        system_prompt,
+                        "{user_input}",
+                        user_input=user_input
+                    ),
+                    response_format={"type": "json_object"},
+                    temperature=0.1
+                )
+                
+            except Exception as e:
+                call.fail(e)
+                return {}
+    
+    async def extract_batch_parameters(self, user_input: str, tool_steps: Dict[int, Dict[str, Any]], use_cache: bool = True, complexity: Optional[str] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Extract parameters for several tool steps in one call.
+        tool_steps maps step number -> {"tool", "description", "parameters"}.
+        Returns step number -> parameter values for the steps the model
+        answered; missing steps should fall back to extract_tool_parameters.
+        """
+        system_prompt = f"""Extract parameters for each of the following tool steps from the user's request.
+
+Steps: {self.prompt_builder.fit('tool_params', {str(number): spec for number, spec in tool_steps.items()})}
+
+Return a JSON object mapping each step number (as a string) to an object with the extracted parameter values for that step's tool."""
+
+        with self.metrics.track("extract_batch_parameters") as call:
+            try:
+                result = await self._complete_json(
+                    "extract_batch_parameters",
+                    complexity=complexity,
+                    validate=self._validate_batch,
+                    use_cache=use_cache,
+                    messages=self._messages(
+                        "extract_batch_parameters",
+                        system_prompt,
+                        "{user_input}",
+                        user_input=user_input
+                    ),
+                    response_format={"type": "json_object"},
+                    temperature=0.1
+                )
+                
+                params = {}
+                for key, values in result.items():
+                    try:
+                        number = int(key)
+                    except (TypeError, ValueError):
+                        continue
+                    if number in tool_steps and isinstance(values, dict) and values:
+                        params[number] = values
+                return params
+                
+            except Exception as e:
+                call.fail(e)
+                return {}
+    
+    def _validate_batch(self, result: Any):
+        """extract_batch_parameters output must be an object keyed by step number"""
+        if not isinstance(result, dict):
+            raise ValueError("Expected an object keyed by step number")
 
 
 # Global LLM service instance
@@ -0,0 +1,139 @@
+"""
+Project Alfred - LLM Completion Cache
+Content-addressed LRU + TTL cache for chat completions, with an optional disk tier
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+from app.services.tracing import tracer
+
+
+# Seconds a cached completion stays valid per LLMService method (0 disables caching)
+DEFAULT_CACHE_TTLS = {
+    "analyze_intent": 600,
+    "create_plan": 600,
+    "plan_with_tools": 600,
+    "analyze_and_plan": 600,
+    "extract_tool_parameters": 3600,
+    "extract_batch_parameters": 3600,
+    "generate_response": 0  # temperature 0.7 - answers are meant to vary
+}
+
+
+class CompletionCache:
+    """Bounded in-memory LRU of completions keyed on a hash of the request"""
+    
+    def __init__(self, max_entries: int = 1024, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "bypassed": 0
+        }
+    
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Hash model, messages, temperature, response format and tools into a cache key"""
+        fingerprint = {
+            "model": request.get("model"),
+            "messages": request.get("messages"),
+            "temperature": request.get("temperature"),
+            "response_format": request.get("response_format"),
+            "tools": request.get("tools"),
+            "tool_choice": request.get("tool_choice")
+        }
+        encoded = json.dumps(fingerprint, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode()).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached value, checking memory first and then disk"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry["expires_at"] > time.time():
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry["value"]
+            del self.entries[key]
+            self.stats["expirations"] += 1
+        
+        if self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._store(key, entry)
+                return entry["value"]
+        
+        self.stats["misses"] += 1
+        return None
+    
+    async def set(self, key: str, value: Dict[str, Any], ttl: float):
+        """Store a value in memory (and on disk if enabled) for ttl seconds"""
+        entry = {"value": value, "expires_at": time.time() + ttl}
+        self._store(key, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, entry)
+    
+    def note_bypass(self):
+        """Count a request that skipped the cache"""
+        self.stats["bypassed"] += 1
+    
+    def clear(self):
+        """Drop all in-memory entries"""
+        self.entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters and current size"""
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "disk_enabled": self.disk_dir is not None,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+    
+    def _store(self, key: str, entry: Dict[str, Any]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.disk_dir / f"{key}.json"
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if entry.get("expires_at", 0) <= time.time():
+            self.stats["expirations"] += 1
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+    
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        path = self.disk_dir / f"{key}.json"
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            tracer.event("llm_cache.disk_write_failed", key=key, error=str(e))
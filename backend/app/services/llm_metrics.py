@@ -0,0 +1,227 @@
+"""
+Project Alfred - LLM Call Metrics
+Per-method, per-model, per-outcome latency histograms, token usage and retry counters
+"""
+
+import time
+import contextlib
+import contextvars
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.services.tracing import tracer
+
+
+# Latency bucket upper bounds in seconds (a final +Inf bucket is implied)
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# The call being made in this context, and the calls made for the current agent request
+_current_call: contextvars.ContextVar[Optional["LLMCall"]] = contextvars.ContextVar("llm_current_call", default=None)
+_request_calls: contextvars.ContextVar[Optional[List["LLMCall"]]] = contextvars.ContextVar("llm_request_calls", default=None)
+_captured_calls: contextvars.ContextVar[Optional[List["LLMCall"]]] = contextvars.ContextVar("llm_captured_calls", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate quantiles"""
+    
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (capped at the max seen)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+    
+    def to_dict(self, buckets: bool = False) -> Dict[str, Any]:
+        data = {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99)
+        }
+        if buckets:
+            cumulative = 0
+            data["buckets"] = []
+            for bound, bucket_count in zip(list(self.bounds) + ["+Inf"], self.counts):
+                cumulative += bucket_count
+                data["buckets"].append({"le": bound, "count": cumulative})
+        return data
+
+
+class LLMCall:
+    """One public LLMService call, including any retries and fallbacks"""
+    
+    def __init__(self, method: str, metrics: "LLMMetrics"):
+        self.method = method
+        self.metrics = metrics
+        self.model: Optional[str] = None
+        self.outcome = "ok"
+        self.attempts = 0
+        self.cached = False
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = 0.0
+        self._started = 0.0
+        self._token = None
+        self.span = None
+    
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+    
+    def fail(self, error: Exception):
+        """Mark the call as having returned its fallback value"""
+        self.outcome = "parse_error" if isinstance(error, ValueError) else "fallback"
+        self.span.fail(error)
+    
+    def add_usage(self, usage: Any):
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+    
+    def __enter__(self) -> "LLMCall":
+        self._started = time.perf_counter()
+        self._token = _current_call.set(self)
+        self.span = tracer.span(f"llm.{self.method}").__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.latency = time.perf_counter() - self._started
+        if exc_type is not None and self.outcome == "ok":
+            self.outcome = "cancelled"
+        self.span.set(
+            model=self.model,
+            outcome=self.outcome,
+            cached=self.cached,
+            attempts=self.attempts,
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens
+        )
+        self.span.__exit__(exc_type, exc, tb)
+        try:
+            _current_call.reset(self._token)
+        except ValueError:
+            # Async generators may be closed from a different context
+            pass
+        self.metrics.record(self)
+        return False
+
+
+class LLMMetrics:
+    """
+    Aggregates LLMCall records into histograms keyed by method, model and
+    outcome, and collects the calls made on behalf of each agent request
+    """
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    
+    def track(self, method: str) -> LLMCall:
+        """Context manager timing one call: with metrics.track("create_plan") as call: ..."""
+        return LLMCall(method, self)
+    
+    def current_call(self) -> Optional[LLMCall]:
+        """The call being made in this context, if any"""
+        return _current_call.get()
+    
+    def record(self, call: LLMCall):
+        key = (call.method, call.model or "unknown", call.outcome)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {
+                "latency": Histogram(self.buckets),
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "retries": 0,
+                "cached": 0
+            }
+        series["latency"].observe(call.latency)
+        series["prompt_tokens"] += call.prompt_tokens
+        series["completion_tokens"] += call.completion_tokens
+        series["retries"] += call.retries
+        series["cached"] += int(call.cached)
+        
+        for calls in (_request_calls.get(), _captured_calls.get()):
+            if calls is not None:
+                calls.append(call)
+    
+    @contextlib.contextmanager
+    def capture(self) -> Iterator[List[LLMCall]]:
+        """Additionally collect the calls made inside this block (they still count toward the request)"""
+        calls: List[LLMCall] = []
+        token = _captured_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            _captured_calls.reset(token)
+    
+    def begin_request(self):
+        """Start collecting the calls made in this context for request_summary"""
+        _request_calls.set([])
+    
+    def request_summary(self) -> Dict[str, Any]:
+        """Totals and a per-method breakdown of the calls since begin_request"""
+        calls = _request_calls.get() or []
+        by_method: Dict[str, Dict[str, Any]] = {}
+        for call in calls:
+            entry = by_method.setdefault(call.method, {
+                "calls": 0,
+                "latency": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "retries": 0,
+                "outcomes": {}
+            })
+            entry["calls"] += 1
+            entry["latency"] += call.latency
+            entry["prompt_tokens"] += call.prompt_tokens
+            entry["completion_tokens"] += call.completion_tokens
+            entry["retries"] += call.retries
+            entry["outcomes"][call.outcome] = entry["outcomes"].get(call.outcome, 0) + 1
+        return {
+            "calls": len(calls),
+            "latency": sum(call.latency for call in calls),
+            "prompt_tokens": sum(call.prompt_tokens for call in calls),
+            "completion_tokens": sum(call.completion_tokens for call in calls),
+            "retries": sum(call.retries for call in calls),
+            "by_method": by_method
+        }
+    
+    def get_stats(self, buckets: bool = False) -> List[Dict[str, Any]]:
+        """One entry per method/model/outcome series"""
+        return [
+            {
+                "method": method,
+                "model": model,
+                "outcome": outcome,
+                "latency": series["latency"].to_dict(buckets),
+                "prompt_tokens": series["prompt_tokens"],
+                "completion_tokens": series["completion_tokens"],
+                "retries": series["retries"],
+                "cached": series["cached"]
+            }
+            for (method, model, outcome), series in sorted(self.series.items())
+        ]
+    
+    def clear(self):
+        self.series.clear()
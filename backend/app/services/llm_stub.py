@@ -0,0 +1,356 @@
+"""
+Project Alfred - Offline LLM Stub Backend
+OpenAI-compatible chat-completions stub with injectable latency and errors, for benchmarking
+"""
+
+import os
+import re
+import json
+import time
+import math
+import random
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+
+
+class LatencyProfile(ABC):
+    """Base class for latency distributions (values in seconds)"""
+    
+    @abstractmethod
+    def sample(self, rng: random.Random) -> float:
+        """Draw one call's latency"""
+        pass
+
+
+class FixedLatency(LatencyProfile):
+    """Every call takes the same time"""
+    
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+    
+    def sample(self, rng: random.Random) -> float:
+        return self.seconds
+
+
+class LognormalLatency(LatencyProfile):
+    """Right-skewed latencies around a median, like real completion endpoints"""
+    
+    def __init__(self, median: float, sigma: float = 0.5):
+        self.mu = math.log(median)
+        self.sigma = sigma
+    
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(self.mu, self.sigma)
+
+
+class ReplayLatency(LatencyProfile):
+    """Cycles through recorded latencies (e.g. exported from production logs)"""
+    
+    def __init__(self, samples: List[float]):
+        if not samples:
+            raise ValueError("Replay latency profile needs at least one sample")
+        self._cycle = itertools.cycle(samples)
+    
+    @classmethod
+    def from_file(cls, path: str) -> "ReplayLatency":
+        """Load one latency in milliseconds per line"""
+        with open(path, "r") as f:
+            return cls([float(line) / 1000 for line in f if line.strip()])
+    
+    def sample(self, rng: random.Random) -> float:
+        return next(self._cycle)
+
+
+def parse_latency(spec: str) -> LatencyProfile:
+    """
+    Parse a latency spec: "fixed:<ms>", "lognormal:<median_ms>[:<sigma>]"
+    or "replay:<path>" (one latency in ms per line)
+    """
+    kind, _, args = spec.partition(":")
+    if kind == "fixed":
+        return FixedLatency(float(args or 0) / 1000)
+    if kind == "lognormal":
+        median, _, sigma = args.partition(":")
+        return LognormalLatency(float(median) / 1000, float(sigma or 0.5))
+    if kind == "replay":
+        return ReplayLatency.from_file(args)
+    raise ValueError(f"Unknown latency profile: {spec}")
+
+
+ARITHMETIC = re.compile(r"(-?\d+(?:\.\d+)?)\s*([+\-*/])\s*(-?\d+(?:\.\d+)?)")
+NUMBER_LIST = re.compile(r"-?\d+(?:\.\d+)?(?:\s*,\s*-?\d+(?:\.\d+)?){2,}")
+OPERATIONS = {"+": "add", "-": "subtract", "*": "multiply", "/": "divide"}
+
+
+class StubLLMBackend:
+    """
+    Answers chat-completion requests deterministically: schema-valid JSON for
+    the analyze/plan/extract prompts and plain text for generate_response.
+    Usable in-process as an httpx transport or served over HTTP.
+    """
+    
+    def __init__(
+        self,
+        latency: Optional[LatencyProfile] = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: int = 0,
+        stream_chunk_words: int = 3
+    ):
+        self.latency = latency or FixedLatency(0.0)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.stream_chunk_words = stream_chunk_words
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "streams": 0
+        }
+    
+    @classmethod
+    def from_env(cls) -> "StubLLMBackend":
+        """Configure from LLM_STUB_* environment variables"""
+        return cls(
+            latency=parse_latency(os.getenv("LLM_STUB_LATENCY", "fixed:0")),
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+            error_status=int(os.getenv("LLM_STUB_ERROR_STATUS", "500")),
+            seed=int(os.getenv("LLM_STUB_SEED", "0"))
+        )
+    
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """In-process transport for LLMService(transport=...)"""
+        return httpx.MockTransport(self.handle)
+    
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """httpx handler for POST .../chat/completions"""
+        if not request.url.path.endswith("/chat/completions"):
+            return httpx.Response(404, json={"error": {"message": "Not found", "type": "invalid_request_error"}})
+        
+        body = json.loads(request.content)
+        status, payload = await self.complete(body)
+        if isinstance(payload, dict):
+            return httpx.Response(status, json=payload)
+        return httpx.Response(status, content=payload, headers={"content-type": "text/event-stream"})
+    
+    async def complete(self, body: Dict[str, Any]):
+        """
+        Produce (status, payload) for a completion request. payload is a JSON
+        dict, or an async iterator of SSE bytes when body["stream"] is set.
+        """
+        self.stats["requests"] += 1
+        latency = self.latency.sample(self.rng)
+        
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            await asyncio.sleep(latency)
+            return self.error_status, {
+                "error": {
+                    "message": "Injected stub error",
+                    "type": "rate_limit_error" if self.error_status == 429 else "server_error"
+                }
+            }
+        
+        if body.get("tools") and not body.get("stream"):
+            await asyncio.sleep(latency)
+            return 200, self._completion(body, None, self._tool_calls(body))
+        
+        content = self._content(body)
+        if body.get("stream"):
+            self.stats["streams"] += 1
+            return 200, self._stream(body, content, latency)
+        
+        await asyncio.sleep(latency)
+        return 200, self._completion(body, content)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+    
+    def _content(self, body: Dict[str, Any]) -> str:
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        request_text = user.split("User request:", 1)[-1].split("\n\n")[0].strip()
+        
+        if "Extract parameters for each" in system:
+            return json.dumps(self._batch_parameters(system, request_text))
+        if "Extract parameters" in system:
+            return json.dumps(self._parameters(system, request_text))
+        if "plans how to fulfil" in system:
+            return json.dumps({"analysis": self._analysis(request_text), "steps": self._steps(request_text)})
+        if "analyzes user requests" in system:
+            return json.dumps(self._analysis(request_text))
+        if "creates execution plans" in system:
+            return json.dumps({"steps": self._steps(request_text)})
+        if body.get("response_format"):
+            return json.dumps({})
+        return f"Here is my answer to \"{request_text[:80]}\". (stub response)"
+    
+    def _analysis(self, text: str) -> Dict[str, Any]:
+        steps = self._steps(text)
+        requires_tools = any(s["action"] == "use_tool" for s in steps)
+        return {
+            "intent": "perform_calculation" if requires_tools else "respond_to_query",
+            "entities": re.findall(r"-?\d+(?:\.\d+)?", text)[:5],
+            "requires_tools": requires_tools,
+            "complexity": "simple" if len(text) < 200 else "medium",
+            "summary": text[:100]
+        }
+    
+    def _steps(self, text: str) -> List[Dict[str, Any]]:
+        steps = []
+        numbers = NUMBER_LIST.search(text)
+        arithmetic = ARITHMETIC.search(text)
+        if numbers:
+            data = [float(n) for n in re.findall(r"-?\d+(?:\.\d+)?", numbers.group(0))]
+            steps.append({
+                "step": 1, "action": "use_tool", "tool": "data_analysis",
+                "description": "Analyze the numbers", "parameters": {"operation": "average", "data": data}
+            })
+        elif arithmetic:
+            steps.append({
+                "step": 1, "action": "use_tool", "tool": "calculator",
+                "description": "Compute the expression", "parameters": {}
+            })
+        steps.append({
+            "step": len(steps) + 1, "action": "generate_response", "tool": None,
+            "description": "Respond to the user"
+        })
+        return steps
+    
+    def _parameters(self, system: str, text: str) -> Dict[str, Any]:
+        arithmetic = ARITHMETIC.search(text)
+        if "'calculator'" in system and arithmetic:
+            return {
+                "operation": OPERATIONS[arithmetic.group(2)],
+                "a": float(arithmetic.group(1)),
+                "b": float(arithmetic.group(3))
+            }
+        if "'echo'" in system:
+            return {"message": text}
+        return {}
+    
+    def _batch_parameters(self, system: str, text: str) -> Dict[str, Any]:
+        steps_line = next((line for line in system.splitlines() if line.startswith("Steps: ")), "Steps: {}")
+        steps = json.loads(steps_line[len("Steps: "):])
+        return {
+            number: self._parameters(f"'{spec.get('tool')}'", text)
+            for number, spec in steps.items()
+        }
+    
+    def _tool_calls(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Native function-calling answer: the plan's tool steps with full arguments"""
+        messages = body.get("messages", [])
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        request_text = user.split("User request:", 1)[-1].split("\n\n")[0].strip()
+        offered = {t["function"]["name"] for t in body["tools"] if t.get("type") == "function"}
+        
+        calls = []
+        for step in self._steps(request_text):
+            if step["action"] == "use_tool" and step["tool"] in offered:
+                arguments = step["parameters"] or self._parameters(f"'{step['tool']}'", request_text)
+                calls.append({
+                    "id": f"call_stub_{len(calls) + 1}",
+                    "type": "function",
+                    "function": {"name": step["tool"], "arguments": json.dumps(arguments)}
+                })
+        return calls
+    
+    def _completion(self, body: Dict[str, Any], content: Optional[str], tool_calls: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        message = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return {
+            "id": f"chatcmpl-stub-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop"
+            }],
+            "usage": self._usage(body, content or json.dumps(tool_calls or []))
+        }
+    
+    async def _stream(self, body: Dict[str, Any], content: str, latency: float) -> AsyncIterator[bytes]:
+        words = content.split(" ")
+        chunks = [
+            " ".join(words[i:i + self.stream_chunk_words]) + " "
+            for i in range(0, len(words), self.stream_chunk_words)
+        ]
+        # A fifth of the latency goes to the first token, the rest is spread over the stream
+        await asyncio.sleep(latency * 0.2)
+        per_chunk = latency * 0.8 / max(len(chunks), 1)
+        for i, text in enumerate(chunks):
+            if i:
+                await asyncio.sleep(per_chunk)
+            yield self._sse(body, {"content": text}, None)
+        yield self._sse(body, {}, "stop")
+        yield b"data: [DONE]\n\n"
+    
+    def _sse(self, body: Dict[str, Any], delta: Dict[str, Any], finish_reason: Optional[str]) -> bytes:
+        chunk = {
+            "id": f"chatcmpl-stub-{self.stats['requests']}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+    
+    def _usage(self, body: Dict[str, Any], content: str) -> Dict[str, int]:
+        prompt = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        prompt_tokens = (prompt + 3) // 4
+        completion_tokens = (len(content) + 3) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+
+def create_stub_app(backend: Optional[StubLLMBackend] = None):
+    """Standalone OpenAI-compatible server (point OPENAI_API_BASE at http://host:port/v1)"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+    
+    backend = backend or StubLLMBackend.from_env()
+    app = FastAPI(title="Project Alfred LLM Stub")
+    
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        status, payload = await backend.complete(await request.json())
+        if isinstance(payload, dict):
+            return JSONResponse(payload, status_code=status)
+        return StreamingResponse(payload, media_type="text/event-stream")
+    
+    @app.get("/stats")
+    async def stats():
+        return backend.get_stats()
+    
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Run the offline OpenAI-compatible stub")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=os.getenv("LLM_STUB_LATENCY", "fixed:0"))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("LLM_STUB_ERROR_RATE", "0")))
+    parser.add_argument("--error-status", type=int, default=int(os.getenv("LLM_STUB_ERROR_STATUS", "500")))
+    parser.add_argument("--seed", type=int, default=int(os.getenv("LLM_STUB_SEED", "0")))
+    args = parser.parse_args()
+    
+    stub = StubLLMBackend(
+        latency=parse_latency(args.latency),
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed
+    )
+    uvicorn.run(create_stub_app(stub), host="0.0.0.0", port=args.port)
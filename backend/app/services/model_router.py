@@ -0,0 +1,80 @@
+"""
+Project Alfred - Model Router
+Per-method, per-complexity model selection with fallback to a stronger model
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+
+class ModelRouter:
+    """
+    Picks the model for each LLMService call from a routing table keyed on
+    method and task complexity, and tracks latency and token usage per route
+    """
+    
+    def __init__(self, strong_model: Optional[str] = None, fast_model: Optional[str] = None):
+        self.strong_model = strong_model or os.getenv("LLM_MODEL", "gpt-4o")
+        self.fast_model = fast_model or os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")
+        self.enabled = os.getenv("LLM_ROUTING_ENABLED", "true").lower() == "true"
+        
+        strong, fast = self.strong_model, self.fast_model
+        # method -> complexity -> model ("default" applies when complexity is unknown)
+        self.routes: Dict[str, Dict[str, str]] = {
+            "analyze_intent": {"default": fast},
+            "analyze_and_plan": {"default": fast, "complex": strong},
+            "extract_tool_parameters": {"default": fast},
+            "extract_batch_parameters": {"default": fast, "complex": strong},
+            "create_plan": {"default": strong, "simple": fast, "medium": strong, "complex": strong},
+            "plan_with_tools": {"default": strong, "simple": fast, "medium": strong, "complex": strong},
+            "generate_response": {"default": strong, "simple": fast, "medium": strong, "complex": strong}
+        }
+        self.stats: Dict[str, Dict[str, Any]] = {}
+    
+    def select(self, method: str, complexity: Optional[str] = None) -> str:
+        """Return the model to use for method at the given complexity"""
+        if not self.enabled:
+            return self.strong_model
+        table = self.routes.get(method, {})
+        return table.get(complexity or "default", table.get("default", self.strong_model))
+    
+    def fallback_for(self, model: str) -> Optional[str]:
+        """Stronger model to retry with when structured output fails, if any"""
+        return self.strong_model if model != self.strong_model else None
+    
+    def record(self, method: str, model: str, latency: float, usage: Optional[Any] = None):
+        """Record one upstream call on the method/model route"""
+        stats = self._route(method, model)
+        stats["calls"] += 1
+        stats["total_latency"] += latency
+        stats["max_latency"] = max(stats["max_latency"], latency)
+        if usage is not None:
+            stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            stats["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+    
+    def record_fallback(self, method: str, model: str):
+        """Count a structured-output failure that was retried on a stronger model"""
+        self._route(method, model)["fallbacks"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-route call, latency, token and fallback statistics"""
+        return {
+            "enabled": self.enabled,
+            "routes": {
+                route: {
+                    **stats,
+                    "avg_latency": stats["total_latency"] / stats["calls"] if stats["calls"] else 0.0
+                }
+                for route, stats in self.stats.items()
+            }
+        }
+    
+    def _route(self, method: str, model: str) -> Dict[str, Any]:
+        return self.stats.setdefault(f"{method}:{model}", {
+            "calls": 0,
+            "fallbacks": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0
+        })
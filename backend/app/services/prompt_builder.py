@@ -0,0 +1,216 @@
+"""
+Project Alfred - Prompt Builder
+Token-budgeted prompt assembly with per-section truncation
+"""
+
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.tracing import tracer
+
+
+# Token budget per prompt section; oversized sections are trimmed to fit
+DEFAULT_SECTION_BUDGETS = {
+    "user_input": 2000,
+    "context": 1000,
+    "analysis": 500,
+    "execution_results": 3000,
+    # Tool lists and parameter specs embedded in system prompts
+    "tool_params": 500
+}
+
+TRUNCATION_MARKER = " …[truncated]… "
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed and its encoding can be
+    loaded, falling back to a ~4 characters per token estimate otherwise
+    """
+    
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+    
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the real tokenizer"""
+        return self._get_encoding() is not None
+    
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Keep the head and tail of text so it fits in max_tokens"""
+        if self.count(text) <= max_tokens:
+            return text
+        
+        keep = max(max_tokens - self.count(TRUNCATION_MARKER), 0)
+        head = keep * 2 // 3
+        tail = keep - head
+        
+        encoding = self._get_encoding()
+        if encoding is None:
+            return text[:head * 4] + TRUNCATION_MARKER + (text[-tail * 4:] if tail else "")
+        
+        tokens = encoding.encode(text, disallowed_special=())
+        return (
+            encoding.decode(tokens[:head])
+            + TRUNCATION_MARKER
+            + (encoding.decode(tokens[-tail:]) if tail else "")
+        )
+    
+    def _get_encoding(self):
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except ImportError:
+                tracer.event("prompt_builder.approximate_tokens", model=self.model, reason="tiktoken not installed")
+            except Exception as e:
+                tracer.event("prompt_builder.approximate_tokens", model=self.model, reason=f"could not load tokenizer: {e}")
+        return self._encoding
+
+
+class PromptBuilder:
+    """Assembles chat messages from named sections, each held to a token budget"""
+    
+    def __init__(self, model: str, max_prompt_tokens: Optional[int] = None):
+        self.counter = TokenCounter(model)
+        self.budgets = dict(DEFAULT_SECTION_BUDGETS)
+        if max_prompt_tokens is None:
+            max_prompt_tokens = int(os.getenv("LLM_MAX_PROMPT_TOKENS", "8000"))
+        self.max_prompt_tokens = max_prompt_tokens
+        self.stats: Dict[str, Dict[str, Any]] = {}
+    
+    def build(
+        self,
+        method: str,
+        system_prompt: str,
+        template: str,
+        sections: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Render template with each section trimmed to its budget.
+        Returns the messages and a report of the final prompt size.
+        """
+        system_tokens = self.counter.count(system_prompt)
+        template_tokens = self.counter.count(template.format(**{name: "" for name in sections}))
+        
+        budgets = {name: self.budgets.get(name, 1000) for name in sections}
+        rendered = {}
+        truncated = set()
+        for name, value in sections.items():
+            text, tokens, was_truncated = self._fit(value, budgets[name])
+            rendered[name] = (text, tokens)
+            if was_truncated:
+                truncated.add(name)
+        
+        # Shrink the largest section until the whole prompt fits the window
+        total = system_tokens + template_tokens + sum(tokens for _, tokens in rendered.values())
+        while total > self.max_prompt_tokens:
+            name = max(rendered, key=lambda n: rendered[n][1])
+            if rendered[name][1] <= 64:
+                break
+            budgets[name] = rendered[name][1] // 2
+            text, tokens, _ = self._fit(sections[name], budgets[name])
+            truncated.add(name)
+            total -= rendered[name][1] - tokens
+            rendered[name] = (text, tokens)
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": template.format(**{name: text for name, (text, _) in rendered.items()})}
+        ]
+        report = {
+            "prompt_tokens": total,
+            "sections": {name: tokens for name, (_, tokens) in rendered.items()},
+            "truncated": sorted(truncated),
+            "exact": self.counter.exact
+        }
+        self._record(method, report)
+        return messages, report
+    
+    def fit(self, name: str, value: Any) -> str:
+        """
+        Serialize value trimmed to the budget of section name, for variable
+        text that goes into a system prompt (tool lists and parameter specs)
+        """
+        text, _, _ = self._fit(value, self.budgets.get(name, 1000))
+        return text
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prompt size statistics per method"""
+        return {
+            method: {
+                **stats,
+                "avg_tokens": stats["total_tokens"] / stats["calls"] if stats["calls"] else 0.0
+            }
+            for method, stats in self.stats.items()
+        }
+    
+    def _fit(self, value: Any, budget: int) -> Tuple[str, int, bool]:
+        """Serialize value and trim it to budget tokens"""
+        text = self._serialize(value)
+        tokens = self.counter.count(text)
+        if tokens <= budget:
+            return text, tokens, False
+        
+        if isinstance(value, (dict, list)):
+            text = self._compact_json(value, budget)
+        else:
+            text = self.counter.truncate(text, budget)
+        return text, self.counter.count(text), True
+    
+    def _compact_json(self, value: Any, budget: int) -> str:
+        """
+        Shrink structured data while keeping it valid JSON: cap long strings
+        and long lists progressively, then hard-truncate as a last resort
+        """
+        max_chars, max_items = max(budget * 2, 32), 50
+        text = self._serialize(self._shrink(value, max_chars, max_items))
+        while self.counter.count(text) > budget and max_chars >= 32:
+            max_chars //= 2
+            max_items = max(max_items // 2, 3)
+            text = self._serialize(self._shrink(value, max_chars, max_items))
+        return self.counter.truncate(text, budget)
+    
+    def _shrink(self, value: Any, max_chars: int, max_items: int) -> Any:
+        if isinstance(value, str) and len(value) > max_chars:
+            return value[:max_chars] + f"…[{len(value) - max_chars} more chars]"
+        if isinstance(value, dict):
+            return {k: self._shrink(v, max_chars, max_items) for k, v in value.items()}
+        if isinstance(value, list):
+            items = [self._shrink(v, max_chars, max_items) for v in value[:max_items]]
+            if len(value) > max_items:
+                items.append(f"…[{len(value) - max_items} more items]")
+            return items
+        return value
+    
+    def _serialize(self, value: Any) -> str:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        return str(value)
+    
+    def _record(self, method: str, report: Dict[str, Any]):
+        stats = self.stats.setdefault(method, {
+            "calls": 0,
+            "total_tokens": 0,
+            "max_tokens": 0,
+            "truncations": 0,
+            "last_tokens": 0
+        })
+        stats["calls"] += 1
+        stats["total_tokens"] += report["prompt_tokens"]
+        stats["max_tokens"] = max(stats["max_tokens"], report["prompt_tokens"])
+        stats["last_tokens"] = report["prompt_tokens"]
+        if report["truncated"]:
+            stats["truncations"] += 1
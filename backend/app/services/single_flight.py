@@ -0,0 +1,66 @@
+"""
+Project Alfred - Single-Flight Request Coalescing
+Concurrent identical requests share one in-flight call and its result
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent calls by key: the first caller starts the work,
+    later callers with the same key await the same task. Exceptions
+    propagate to every waiter. The shared call is only cancelled once all
+    of its waiters have gone away.
+    """
+    
+    def __init__(self):
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.waiters: Dict[str, int] = {}
+        self.stats = {
+            "calls": 0,
+            "coalesced": 0,
+            "abandoned": 0
+        }
+    
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() unless an identical call is already in flight"""
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.inflight[key] = task
+            self.waiters[key] = 0
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        
+        self.waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Cancel the shared call only if nobody else is waiting on it
+            if self.inflight.get(key) is task:
+                self.waiters[key] -= 1
+                if self.waiters[key] == 0 and not task.done():
+                    self.stats["abandoned"] += 1
+                    task.cancel()
+            raise
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        requests = self.stats["calls"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "inflight": len(self.inflight),
+            "coalesce_rate": self.stats["coalesced"] / requests if requests else 0.0
+        }
+    
+    def _finish(self, key: str, task: asyncio.Task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+            del self.waiters[key]
+        # Mark the exception as retrieved even if every waiter has left
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,262 @@
+"""
+Project Alfred - Tracing
+Request-scoped trace IDs and timed spans kept in a ring buffer, exported as JSON lines
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import contextvars
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Union
+
+
+# The innermost open span in this context; spans opened here become its children
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_current_span", default=None)
+
+
+def _new_id(bits: int = 64) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation. Use as a context manager: with tracer.span("name") as span: ..."""
+    
+    __slots__ = (
+        "tracer", "trace_id", "span_id", "parent_id", "name", "attributes",
+        "events", "status", "error", "start", "duration", "_started", "_token"
+    )
+    
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.trace_id = parent.trace_id if parent else _new_id(128)
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self._started = time.perf_counter()
+        self._token = None
+    
+    def set(self, **attributes):
+        """Add or overwrite attributes"""
+        self.attributes.update(attributes)
+    
+    def event(self, name: str, **attributes):
+        """Record a point-in-time event inside this span"""
+        self.events.append({"name": name, "offset": time.perf_counter() - self._started, **attributes})
+    
+    def fail(self, error: Union[BaseException, str]):
+        """Mark the span failed with an exception or an error message"""
+        if isinstance(error, str):
+            self.status, self.error = "error", error
+            return
+        self.status = "cancelled" if isinstance(error, asyncio.CancelledError) else "error"
+        self.error = str(error) or type(error).__name__
+    
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+            self.tracer._finish(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": self.events
+        }
+    
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self.status == "ok":
+            self.fail(exc)
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Async generators may be closed from a different context
+            pass
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled"""
+    
+    trace_id = None
+    span_id = None
+    
+    def set(self, **attributes):
+        pass
+    
+    def event(self, name: str, **attributes):
+        pass
+    
+    def fail(self, error: Union[BaseException, str]):
+        pass
+    
+    def end(self):
+        pass
+    
+    def __enter__(self) -> "_NoopSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Records finished spans in a fixed-size ring buffer (oldest dropped) and,
+    when TRACE_EXPORT_PATH is set, appends them to that file as JSON lines
+    in batches written off the event loop
+    """
+    
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        buffer_size: Optional[int] = None,
+        export_path: Optional[str] = None,
+        export_batch: int = 256
+    ):
+        if enabled is None:
+            enabled = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.spans: Deque[Span] = deque(maxlen=buffer_size or int(os.getenv("TRACE_BUFFER_SIZE", "5000")))
+        # Events recorded outside any span (startup, background housekeeping)
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=1000)
+        self.export_path = export_path if export_path is not None else os.getenv("TRACE_EXPORT_PATH", "")
+        self.export_batch = export_batch
+        self._pending: List[Dict[str, Any]] = []
+        self._exporting: Optional[asyncio.Task] = None
+        self.stats = {
+            "spans": 0,
+            "traces": 0,
+            "errors": 0,
+            "exported": 0,
+            "export_errors": 0
+        }
+    
+    def span(self, name: str, **attributes) -> Span:
+        """A child of the current span (or the root of a new trace if there is none)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            self.stats["traces"] += 1
+        return Span(self, name, parent, attributes)
+    
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+    
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace_id if span else None
+    
+    def event(self, name: str, **attributes):
+        """Attach an event to the current span, or keep it as a standalone event outside any trace"""
+        if not self.enabled:
+            return
+        span = _current_span.get()
+        if span is not None:
+            span.event(name, **attributes)
+            return
+        record = {"name": name, "time": time.time(), "attributes": attributes}
+        self.events.append(record)
+        if self.export_path:
+            self._pending.append({"type": "event", **record})
+    
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Every buffered span of one trace, in start order"""
+        return [span.to_dict() for span in sorted(
+            (s for s in list(self.spans) if s.trace_id == trace_id), key=lambda s: s.start
+        )]
+    
+    def recent_traces(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Summaries of the most recent traces whose root span is still buffered"""
+        traces = []
+        for span in reversed(list(self.spans)):
+            if span.parent_id is None:
+                traces.append({
+                    "trace_id": span.trace_id,
+                    "name": span.name,
+                    "start": span.start,
+                    "duration": span.duration,
+                    "status": span.status,
+                    "attributes": span.attributes
+                })
+                if len(traces) >= limit:
+                    break
+        return traces
+    
+    async def flush(self):
+        """Write any spans still waiting for export"""
+        if self._exporting is not None:
+            await asyncio.gather(self._exporting, return_exceptions=True)
+        if self._pending:
+            batch, self._pending = self._pending, []
+            await asyncio.to_thread(self._write, batch)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "buffered": len(self.spans),
+            "buffer_size": self.spans.maxlen,
+            "export_path": self.export_path or None,
+            "export_pending": len(self._pending)
+        }
+    
+    def _finish(self, span: Span):
+        self.spans.append(span)
+        self.stats["spans"] += 1
+        if span.status == "error":
+            self.stats["errors"] += 1
+        if self.export_path:
+            self._pending.append({"type": "span", **span.to_dict()})
+            if len(self._pending) >= self.export_batch and self._exporting is None:
+                self._schedule_export()
+    
+    def _schedule_export(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        batch, self._pending = self._pending, []
+        self._exporting = loop.create_task(asyncio.to_thread(self._write, batch))
+        self._exporting.add_done_callback(self._export_done)
+    
+    def _export_done(self, task: asyncio.Task):
+        self._exporting = None
+        if len(self._pending) >= self.export_batch:
+            self._schedule_export()
+    
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            with open(self.export_path, "a") as f:
+                f.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+            self.stats["exported"] += len(batch)
+        except OSError:
+            self.stats["export_errors"] += len(batch)
+
+
+# Global tracer instance
+tracer = Tracer()
@@ -7,6 +7,7 @@ import requests
 from typing import List, Dict, Any, Optional
 from urllib.parse import quote_plus
 import time
+from app.services.deadline import remaining_timeout
 
 
 class WebSearchService:
@@ -43,7 +44,7 @@ class WebSearchService:
             response = self.session.get(
                 self.base_url,
                 params=params,
-                timeout=10
+                timeout=remaining_timeout(10, "web search")
             )
             
             if response.status_code != 200:
@@ -128,7 +129,7 @@ class WebSearchService:
             response = self.session.get(
                 self.base_url,
                 params=params,
-                timeout=5
+                timeout=remaining_timeout(5, "web search")
             )
             
             if response.status_code == 200:
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3.11
+"""
+Project Alfred - Event Loop Lag Test
+Verifies that concurrent /chat calls overlap instead of running one after another
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+from app.main import app
+from app.core import agent as agent_module
+from app.services.llm import LLMService
+from app.services.llm_stub import FixedLatency, StubLLMBackend
+
+LLM_DELAY = 0.2  # Simulated upstream latency per completion
+NUM_REQUESTS = 10
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list):
+    """Record how late a 10ms ticker wakes up while requests are in flight"""
+    interval = 0.01
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def run_test() -> bool:
+    stub = StubLLMBackend(latency=FixedLatency(LLM_DELAY))
+    agent_module.llm_service = LLMService(transport=stub.transport())
+    agent_module.llm_service.prompt_builder.counter.exact  # Load the tokenizer before measuring
+    
+    # analyze + plan + generate_response
+    serial_time = NUM_REQUESTS * 3 * LLM_DELAY
+    lag_samples = []
+    stop = asyncio.Event()
+    
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        ticker = asyncio.create_task(measure_loop_lag(stop, lag_samples))
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/chat", json={"message": f"Hello Alfred! #{i}", "user_id": f"lag-user-{i}"})
+            for i in range(NUM_REQUESTS)
+        ])
+        total_time = time.perf_counter() - start
+        stop.set()
+        await ticker
+    
+    await agent_module.llm_service.aclose()
+    
+    successful = sum(1 for r in responses if r.status_code == 200)
+    max_lag = max(lag_samples) if lag_samples else 0.0
+    
+    print("\n" + "=" * 60)
+    print("EVENT LOOP LAG RESULTS")
+    print("=" * 60)
+    print(f"  Requests: {NUM_REQUESTS} ({successful} successful)")
+    print(f"  Total Time: {total_time:.3f}s (serial would be {serial_time:.3f}s)")
+    print(f"  Max Loop Lag: {max_lag * 1000:.1f}ms")
+    
+    overlapped = successful == NUM_REQUESTS and total_time < serial_time / 2 and max_lag < LLM_DELAY
+    print("\n🎯 Test Verdict:")
+    if overlapped:
+        print("  ✅ PASS - Concurrent requests overlap")
+    else:
+        print("  ❌ FAIL - Requests are serialized on the event loop")
+    print("=" * 60)
+    
+    return overlapped
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run_test()) else 1)